@@ -5,7 +5,8 @@ from .agent import (
     AgentState,
     MCPConnectionManager,
     ResearchAssistant,
-    RESEARCH_ASSISTANT_PROMPT
+    RESEARCH_ASSISTANT_PROMPT,
+    get_cache_stats
 )
 
 __all__ = [
@@ -13,5 +14,6 @@ __all__ = [
     "AgentState", 
     "MCPConnectionManager",
     "ResearchAssistant",
-    "RESEARCH_ASSISTANT_PROMPT"
+    "RESEARCH_ASSISTANT_PROMPT",
+    "get_cache_stats"
 ]
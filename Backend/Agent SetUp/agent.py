@@ -5,70 +5,246 @@ This module provides:
 - Agent class: LangGraph-based agent with tool calling
 - MCPConnectionManager: Manages connection to MCP server
 - ResearchAssistant: High-level interface combining agent + MCP tools
+- get_cache_stats: Statistics for the process-wide assistant cache
 """
 
 import os
+import json
+import asyncio
+import atexit
+import hashlib
+import logging
+import logging.handlers
+import queue
+import time
 import operator
-from typing import List, Annotated, TypedDict, Optional, Any
-from langchain_core.messages import AnyMessage, SystemMessage, ToolMessage, AIMessage, HumanMessage
+import uuid
+from collections import OrderedDict
+from functools import lru_cache, cache
+from typing import List, Annotated, TypedDict, Optional, Any, AsyncIterator, TYPE_CHECKING
+from langchain_core.messages import AnyMessage, SystemMessage, ToolMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, START, END
-from langchain_openai import ChatOpenAI
+from langgraph.checkpoint.memory import MemorySaver
 from langchain.tools import StructuredTool
-from pydantic import BaseModel, Field
-from mcp import ClientSession
-from mcp.client.sse import sse_client
+from pydantic import BaseModel, Field, create_model
+import httpx
+import tiktoken
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+    from mcp import ClientSession
+
+
+# ============== Logging ==============
+
+# Per-call agent logs go through a queue so the event loop never blocks on stdout;
+# a listener thread does the actual writes.
+logger = logging.getLogger(__name__)
+logger.setLevel(os.getenv("AGENT_LOG_LEVEL", "INFO").upper())
+logger.propagate = False
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 
 
 # ============== Agent State & Class ==============
 
+# MCP tools with side effects (downloads, indexing, file output). Their results are never
+# served from cache, and calling one clears cached results of the others. Every write
+# tool exposed by the MCP server must be listed here.
+SIDE_EFFECT_TOOLS = (
+    "download_paper",
+    "download_papers",
+    "generate_report",
+)
+
 class AgentState(TypedDict):
     messages: Annotated[list[AnyMessage], operator.add]
 
 
+def exists_action(state: AgentState) -> bool:
+    """Route to the action node when the last message requests tool calls."""
+    # Only AIMessage carries a truthy tool_calls attribute, so no isinstance check is needed
+    return bool(getattr(state['messages'][-1], "tool_calls", None))
+
+
+async def _llm_node(state: AgentState, config: RunnableConfig):
+    return await config["configurable"]["agent"].call_openai(state)
+
+
+async def _action_node(state: AgentState, config: RunnableConfig):
+    return await config["configurable"]["agent"].take_action(state)
+
+
+@cache
+def _build_compiled_graph():
+    """
+    Compile the agent graph once per process. The topology is fixed; nodes dispatch
+    to the Agent instance passed in via config["configurable"]["agent"]. Conversation
+    state lives in the checkpointer, keyed by config["configurable"]["thread_id"].
+    """
+    graph = StateGraph(AgentState)
+    graph.add_node("llm", _llm_node)
+    graph.add_node("action", _action_node)
+    graph.add_conditional_edges(
+        "llm",
+        exists_action,
+        {True: "action", False: END}
+    )
+    graph.add_edge("action", "llm")
+    graph.set_entry_point("llm")
+    return graph.compile(checkpointer=MemorySaver())
+
+
 class Agent:
     """LangGraph-based agent with tool calling capabilities."""
 
-    def __init__(self, model, tools, system=""):
+    # Tools with side effects whose results must never be served from cache
+    NON_CACHEABLE_TOOLS = frozenset(SIDE_EFFECT_TOOLS)
+    # Local tool that returns the full text behind a compacted tool result
+    EXPAND_DOC_TOOL = "expand_doc"
+
+    def __init__(
+        self,
+        model,
+        tools,
+        system="",
+        tool_cache_max: int = 256,
+        tool_cache_ttl: float = 300.0,
+        max_concurrency: int = 8,
+        compact_threshold: int = 4000,
+        preview_chars: int = 500,
+        blob_store_max: int = 256
+    ):
         self.system = system
-        graph = StateGraph(AgentState)
-        graph.add_node("llm", self.call_openai)
-        graph.add_node("action", self.take_action)
-        graph.add_conditional_edges(
-            "llm",
-            self.exists_action,
-            {True: "action", False: END}
-        )
-        graph.add_edge("action", "llm")
-        graph.set_entry_point("llm")
-        self.graph = graph.compile()
+        # Built once and reused so every request starts with a byte-identical prefix,
+        # which lets OpenAI's automatic prompt caching (1024+ token prefixes) kick in
+        self._system_message = SystemMessage(content=system) if system else None
+        self._tool_semaphore = asyncio.Semaphore(max_concurrency)
+        # (result, monotonic time stored); entries expire after tool_cache_ttl seconds because the
+        # server can index papers later without a tool call here (e.g. Batch API downloads)
+        self._tool_cache: OrderedDict[str, tuple] = OrderedDict()
+        self._tool_cache_max = tool_cache_max
+        self._tool_cache_ttl = tool_cache_ttl
+        # Large tool results are kept here and the model only sees a doc_id + preview,
+        # so they are not re-sent with every later prompt in the thread
+        self._blob_store: OrderedDict[str, str] = OrderedDict()
+        self._blob_store_max = blob_store_max
+        self._compact_threshold = compact_threshold
+        self._preview_chars = preview_chars
+        tools = [*tools, StructuredTool.from_function(
+            coroutine=self._expand_doc,
+            name=self.EXPAND_DOC_TOOL,
+            description=(
+                "Get the full text of an earlier tool result that was shortened to a "
+                "doc_id and preview. Only call this when the preview is not enough."
+            )
+        )]
+        # Shared precompiled graph, bound to this instance's nodes via config
+        self.graph = _build_compiled_graph().with_config(configurable={"agent": self})
         self.tools = {t.name: t for t in tools}
         self.model = model.bind_tools(tools)
 
-    def exists_action(self, state: AgentState):
-        result = state['messages'][-1]
-        want_tools = isinstance(result, AIMessage) and bool(getattr(result, "tool_calls", None))
-        return want_tools
+    exists_action = staticmethod(exists_action)
+    
+    def thread_config(self, thread_id: str) -> dict:
+        """
+        Runtime config for a checkpointed thread. LangGraph replaces the bound
+        "configurable" dict rather than merging it, so the agent is passed again here.
+        """
+        return {"configurable": {"agent": self, "thread_id": thread_id}}
 
     async def call_openai(self, state: AgentState):
         messages = state['messages']
-        if self.system:
-            messages = [SystemMessage(content=self.system)] + messages
+        if self._system_message is not None:
+            messages = [self._system_message, *messages]
         message = await self.model.ainvoke(messages)
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            cached = (usage.get("input_token_details") or {}).get("cache_read", 0)
+            logger.debug("Prompt tokens: %s (cached: %s)", usage.get("input_tokens", 0), cached)
         return {'messages': [message]}
 
     async def take_action(self, state: AgentState):
         tool_calls = state['messages'][-1].tool_calls
-        results = []
+        # Identical calls (same name + args) in one turn are invoked once; every
+        # tool_call_id still gets its own ToolMessage with the shared result.
+        unique = {}
+        keys = []
         for t in tool_calls:
-            print(f"Calling: {t}")
-            if t['name'] not in self.tools:
-                print("\n ....bad tool name....")
-                result = "bad tool name, retry"
-            else:
-                result = await self.tools[t['name']].ainvoke(t['args'])
-            results.append(ToolMessage(tool_call_id=t['id'], name=t['name'], content=str(result)))
-        print("Back to the model!")
-        return {'messages': results}
+            key = (t['name'], json.dumps(t['args'], sort_keys=True, default=str))
+            unique.setdefault(key, t)
+            keys.append(key)
+        # Independent tool calls are I/O-bound MCP round-trips, so run them concurrently.
+        # asyncio.gather preserves input order, keeping results aligned with their keys.
+        results = await asyncio.gather(*[self._invoke_one(t) for t in unique.values()])
+        by_key = dict(zip(unique, results))
+        logger.debug("Back to the model!")
+        return {'messages': [
+            ToolMessage(tool_call_id=t['id'], name=t['name'], content=by_key[key])
+            for t, key in zip(tool_calls, keys)
+        ]}
+
+    async def _invoke_one(self, t: dict) -> str:
+        """Run a single tool call (bounded by the concurrency semaphore) and return its content."""
+        logger.debug("Calling tool %s args=%s", t['name'], t['args'])
+        if t['name'] not in self.tools:
+            logger.warning("Bad tool name: %s", t['name'])
+            return "bad tool name, retry"
+        if t['name'] == self.EXPAND_DOC_TOOL:
+            return await self.tools[t['name']].ainvoke(t['args'])
+        async with self._tool_semaphore:
+            result = await self._invoke_tool_cached(t['name'], t['args'])
+        return self._compact(result if isinstance(result, str) else str(result))
+
+    def _compact(self, text: str) -> str:
+        """Replace a large tool result with a doc_id handle and a short preview."""
+        if len(text) <= self._compact_threshold:
+            return text
+        doc_id = hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+        self._blob_store[doc_id] = text
+        self._blob_store.move_to_end(doc_id)
+        if len(self._blob_store) > self._blob_store_max:
+            self._blob_store.popitem(last=False)
+        return (
+            f"[doc_id={doc_id}, preview={text[:self._preview_chars]}] "
+            f"({len(text)} chars; call {self.EXPAND_DOC_TOOL} with this doc_id for the full text)"
+        )
+
+    async def _expand_doc(self, doc_id: str) -> str:
+        """Return the full text stored for doc_id."""
+        text = self._blob_store.get(doc_id)
+        if text is None:
+            return f"Unknown doc_id {doc_id!r}; it may have expired. Re-run the original tool instead."
+        self._blob_store.move_to_end(doc_id)
+        return text
+
+    async def _invoke_tool_cached(self, name: str, args: dict):
+        """Invoke a tool, memoizing results by (tool name, args hash) in a bounded, expiring LRU."""
+        if name in self.NON_CACHEABLE_TOOLS:
+            result = await self.tools[name].ainvoke(args)
+            # Side effects (e.g. newly indexed papers) can change other tools' answers
+            self._tool_cache.clear()
+            return result
+
+        args_hash = hashlib.blake2b(json.dumps(args, sort_keys=True, default=str).encode()).hexdigest()
+        key = f"{name}:{args_hash}"
+        cached = self._tool_cache.get(key)
+        if cached is not None and time.monotonic() - cached[1] < self._tool_cache_ttl:
+            self._tool_cache.move_to_end(key)
+            return cached[0]
+
+        result = str(await self.tools[name].ainvoke(args))
+        self._tool_cache[key] = (result, time.monotonic())
+        self._tool_cache.move_to_end(key)
+        if len(self._tool_cache) > self._tool_cache_max:
+            self._tool_cache.popitem(last=False)
+        return result
 
 
 # ============== MCP Connection Manager ==============
@@ -78,20 +254,29 @@ class MCPConnectionManager:
     
     def __init__(self, server_url: str = "http://127.0.0.1:8787/sse"):
         self.server_url = server_url
-        self.session: Optional[ClientSession] = None
+        self.session: Optional["ClientSession"] = None
         self.client = None
+        self.server_version: Optional[str] = None
         self._initialized = False
+        # ResearchAssistants sharing this connection (see _RA_CACHE); the last one to close it closes it
+        self.users = 0
     
-    async def initialize(self) -> ClientSession:
+    async def initialize(self) -> "ClientSession":
         """Initialize connection to MCP server. Returns existing session if already connected."""
         if self._initialized and self.session:
             return self.session
 
+        # The mcp package is only needed once a connection is opened
+        from mcp import ClientSession
+        from mcp.client.sse import sse_client
+
         self.client = sse_client(self.server_url)
         read_stream, write_stream = await self.client.__aenter__()
         self.session = ClientSession(read_stream, write_stream)
         await self.session.__aenter__()
-        await self.session.initialize()
+        init_result = await self.session.initialize()
+        server_info = getattr(init_result, "serverInfo", None)
+        self.server_version = getattr(server_info, "version", None)
         self._initialized = True
         return self.session
     
@@ -136,6 +321,108 @@ with open(PROMPT_PATH, "r", encoding="utf-8") as file:
     RESEARCH_ASSISTANT_PROMPT = file.read()
 
 
+@lru_cache(maxsize=128)
+def _build_args_model(tool_name: str, input_schema_json: str) -> type[BaseModel]:
+    """
+    Build (and memoize) the Pydantic args model for an MCP tool input schema.
+    Keyed by (tool name, sorted schema JSON) so identical schemas skip Pydantic model compilation.
+    """
+    input_schema = json.loads(input_schema_json)
+    field_definitions = {}
+    if input_schema and "properties" in input_schema:
+        for prop_name, prop_info in input_schema["properties"].items():
+            field_type = str if prop_info.get("type") == "string" else Any
+            required = prop_name in input_schema.get("required", [])
+            if required:
+                field_definitions[prop_name] = (
+                    field_type, 
+                    Field(description=prop_info.get("description", ""))
+                )
+            else:
+                field_definitions[prop_name] = (
+                    Optional[field_type], 
+                    Field(default=None, description=prop_info.get("description", ""))
+                )
+    
+    # Dynamically create Pydantic model for tool args
+    return create_model(f"{tool_name}Args", **field_definitions)
+
+
+# Process-wide cache of initialized assistants keyed by MCP server URL, so that
+# re-created assistants (reloads, re-imports) reuse the MCP session and tools.
+_RA_CACHE: dict[str, "ResearchAssistant"] = {}
+_RA_LOCK = asyncio.Lock()
+_RA_CACHE_STATS = {"hits": 0, "misses": 0, "init_ms": None}
+
+
+def get_cache_stats() -> dict:
+    """Return hit/miss counters and the last cold initialization time of the assistant cache."""
+    return {
+        **_RA_CACHE_STATS,
+        "cached_servers": list(_RA_CACHE.keys()),
+    }
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model_name: str) -> Optional[tiktoken.Encoding]:
+    """
+    Return the tiktoken encoding for a model, falling back to o200k_base for unknown models.
+    Returns None if the encoding files cannot be loaded (e.g. no network access).
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning("Could not load tiktoken encoding, estimating tokens from length: %s", e)
+        return None
+
+
+def _count_text_tokens(text: str, model_name: str) -> int:
+    """Count tokens with tiktoken, or estimate ~4 characters per token without it."""
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+# ChatOpenAI clients shared across ResearchAssistant instances, keyed by model name
+_LLM_CACHE: dict[str, "ChatOpenAI"] = {}
+# langchain_openai (and the openai SDK) is imported on first use in _get_llm
+_ChatOpenAI = None
+
+
+@cache
+def _shared_httpx_async_client() -> httpx.AsyncClient:
+    """Process-wide async HTTP client so every cached LLM reuses one connection pool."""
+    return httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=32), http2=True)
+
+
+def _get_llm(model_name: str) -> "ChatOpenAI":
+    """Return the shared ChatOpenAI for a model, creating it on first use."""
+    global _ChatOpenAI
+    if _ChatOpenAI is None:
+        from langchain_openai import ChatOpenAI
+        _ChatOpenAI = ChatOpenAI
+    if model_name not in _LLM_CACHE:
+        # stream_usage keeps token usage (incl. cached prompt tokens) available while streaming
+        _LLM_CACHE[model_name] = _ChatOpenAI(
+            model=model_name,
+            streaming=True,
+            stream_usage=True,
+            http_async_client=_shared_httpx_async_client()
+        )
+    return _LLM_CACHE[model_name]
+
+
+HISTORY_SUMMARY_PROMPT = (
+    "Summarize the following earlier part of a conversation between a user and a research "
+    "assistant. Keep the user's goals, papers and findings discussed, and any decisions made. "
+    "Be concise."
+)
+
+
 class ResearchAssistant:
     """
     High-level Research Assistant that combines LangGraph Agent with MCP tools.
@@ -150,17 +437,31 @@ class ResearchAssistant:
         self,
         mcp_server_url=os.getenv("MCP_SERVER_URL", "http://127.0.0.1:8787/sse"),
         model_name: str = "gpt-5",
-        system_prompt: str = RESEARCH_ASSISTANT_PROMPT
+        system_prompt: str = RESEARCH_ASSISTANT_PROMPT,
+        cache_ttl_seconds: int = 300,
+        cache_path: str = ".mcp_tools_cache.json",
+        max_history_tokens: int = 4000,
+        summarize_after_dropped: int = 20
     ):
         self.mcp_server_url = mcp_server_url
         self.model_name = model_name
         self.system_prompt = system_prompt
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_path = cache_path
+        self.max_history_tokens = max_history_tokens
+        self.summarize_after_dropped = summarize_after_dropped
         
         self.mcp_manager: Optional[MCPConnectionManager] = None
-        self.session: Optional[ClientSession] = None
+        self.session: Optional["ClientSession"] = None
         self.agent: Optional[Agent] = None
         self.tools: List[StructuredTool] = []
+        # Source of truth is the graph checkpoint for thread_id; this is a mirror for /status
         self.conversation_history: List[AnyMessage] = []
+        self.thread_id = uuid.uuid4().hex
+        self._thread_prefix_len = 0
+        self._llm: Optional["ChatOpenAI"] = None
+        self._dropped_messages: List[AnyMessage] = []
+        self._history_summary: Optional[str] = None
         self._initialized = False
     
     def _create_mcp_tool_wrapper(self, tool_name: str):
@@ -174,6 +475,37 @@ class ResearchAssistant:
             return "No content returned"
         return mcp_tool_wrapper
     
+    def _load_cached_tool_specs(self) -> Optional[List[dict]]:
+        """Return cached MCP tool schemas if the cache is fresh and matches this server."""
+        if not self.cache_path or self.cache_ttl_seconds <= 0:
+            return None
+        try:
+            if time.time() - os.path.getmtime(self.cache_path) >= self.cache_ttl_seconds:
+                return None
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        server_version = self.mcp_manager.server_version if self.mcp_manager else None
+        if cached.get("server_url") != self.mcp_server_url or cached.get("server_version") != server_version:
+            return None
+        return cached.get("tools")
+    
+    def _save_cached_tool_specs(self, tool_specs: List[dict]):
+        """Persist MCP tool schemas so warm restarts can skip list_tools()."""
+        if not self.cache_path or self.cache_ttl_seconds <= 0:
+            return
+        try:
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "server_url": self.mcp_server_url,
+                    "server_version": self.mcp_manager.server_version if self.mcp_manager else None,
+                    "tools": tool_specs,
+                }, f)
+        except (OSError, TypeError) as e:
+            logger.warning("Could not write MCP tool cache: %s", e)
+    
     async def initialize(self) -> bool:
         """
         Initialize the research assistant:
@@ -183,48 +515,66 @@ class ResearchAssistant:
         
         Returns True if successful.
         """
+        async with _RA_LOCK:
+            cached = _RA_CACHE.get(self.mcp_server_url)
+            if cached is not None and cached is not self and cached.is_ready:
+                # Reuse the already established MCP session, tools and agent
+                self.mcp_manager = cached.mcp_manager
+                self.mcp_manager.users += 1
+                self.session = cached.session
+                self.tools = cached.tools
+                self.agent = cached.agent
+                self._llm = cached._llm
+                self._initialized = True
+                _RA_CACHE_STATS["hits"] += 1
+                print("✓ Reused cached MCP session and agent")
+                return True
+            
+            _RA_CACHE_STATS["misses"] += 1
+            start = time.perf_counter()
+            success = await self._initialize_uncached()
+            if success:
+                _RA_CACHE_STATS["init_ms"] = round((time.perf_counter() - start) * 1000, 2)
+                _RA_CACHE[self.mcp_server_url] = self
+            return success
+    
+    async def _initialize_uncached(self) -> bool:
+        """Connect to MCP, load tools and build the agent without consulting the process cache."""
         try:
             # Connect to MCP Server
             self.mcp_manager = MCPConnectionManager(self.mcp_server_url)
+            self.mcp_manager.users = 1
             self.session = await self.mcp_manager.initialize()
             print("✓ Connected to MCP Server")
             
-            # Get tools from MCP
-            tools_response = await self.session.list_tools()
+            # Get tools from MCP (served from the on-disk cache while it is fresh)
+            tool_specs = self._load_cached_tool_specs()
+            if tool_specs is None:
+                tools_response = await self.session.list_tools()
+                tool_specs = [
+                    {
+                        "name": tool.name,
+                        "description": tool.description,
+                        "inputSchema": tool.inputSchema,
+                    }
+                    for tool in tools_response.tools
+                ]
+                self._save_cached_tool_specs(tool_specs)
+            else:
+                print("✓ Loaded tool schemas from cache")
             
             # Convert MCP tools to LangChain StructuredTools
             self.tools = []
-            for tool in tools_response.tools:
-                field_definitions = {}
-                if tool.inputSchema and "properties" in tool.inputSchema:
-                    for prop_name, prop_info in tool.inputSchema["properties"].items():
-                        field_type = str if prop_info.get("type") == "string" else Any
-                        required = prop_name in tool.inputSchema.get("required", [])
-                        if required:
-                            field_definitions[prop_name] = (
-                                field_type, 
-                                Field(description=prop_info.get("description", ""))
-                            )
-                        else:
-                            field_definitions[prop_name] = (
-                                Optional[field_type], 
-                                Field(default=None, description=prop_info.get("description", ""))
-                            )
-                
-                # Dynamically create Pydantic model for tool args
-                ArgsModel = type(
-                    f"{tool.name}Args", 
-                    (BaseModel,), 
-                    {
-                        "__annotations__": {k: v[0] for k, v in field_definitions.items()}, 
-                        **{k: v[1] for k, v in field_definitions.items()}
-                    }
+            for spec in tool_specs:
+                ArgsModel = _build_args_model(
+                    spec["name"],
+                    json.dumps(spec["inputSchema"] or {}, sort_keys=True)
                 )
                 
                 structured_tool = StructuredTool(
-                    name=tool.name,
-                    description=tool.description,
-                    coroutine=self._create_mcp_tool_wrapper(tool.name),
+                    name=spec["name"],
+                    description=spec["description"],
+                    coroutine=self._create_mcp_tool_wrapper(spec["name"]),
                     args_schema=ArgsModel
                 )
                 self.tools.append(structured_tool)
@@ -232,8 +582,8 @@ class ResearchAssistant:
             print(f"✓ Loaded {len(self.tools)} tools: {[t.name for t in self.tools]}")
             
             # Create LLM and Agent
-            llm = ChatOpenAI(model=self.model_name)
-            self.agent = Agent(llm, self.tools, system=self.system_prompt)
+            self._llm = _get_llm(self.model_name)
+            self.agent = Agent(self._llm, self.tools, system=self.system_prompt)
             print("✓ Agent created with workflow system prompt")
             
             self._initialized = True
@@ -243,6 +593,83 @@ class ResearchAssistant:
             print(f"✗ Failed to initialize: {e}")
             return False
     
+    def _count_tokens(self, message: AnyMessage) -> int:
+        """Approximate the prompt tokens a message contributes (content + tool calls + overhead)."""
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content, default=str)
+        tokens = _count_text_tokens(content, self.model_name) + 4
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            tokens += _count_text_tokens(json.dumps(tool_calls, default=str), self.model_name)
+        return tokens
+    
+    async def _trim_history(self):
+        """
+        Drop the oldest turns until the history fits in max_history_tokens.
+        
+        Whole turns (a HumanMessage plus the AI/tool messages that follow it) are dropped,
+        so tool calls always stay paired with their ToolMessages. Once enough messages have
+        been dropped they are folded into a running summary with a single LLM call.
+        """
+        turns: List[List[AnyMessage]] = []
+        for msg in self.conversation_history:
+            if isinstance(msg, HumanMessage) or not turns:
+                turns.append([msg])
+            else:
+                turns[-1].append(msg)
+        
+        total = sum(self._count_tokens(m) for m in self.conversation_history)
+        while len(turns) > 1 and total > self.max_history_tokens:
+            dropped = turns.pop(0)
+            total -= sum(self._count_tokens(m) for m in dropped)
+            self._dropped_messages.extend(dropped)
+        self.conversation_history = [m for turn in turns for m in turn]
+        
+        if self._llm and len(self._dropped_messages) >= self.summarize_after_dropped:
+            transcript = "\n".join(
+                f"{type(m).__name__}: {m.content}" for m in self._dropped_messages if m.content
+            )
+            if self._history_summary:
+                transcript = f"Previous summary: {self._history_summary}\n\n{transcript}"
+            response = await self._llm.ainvoke([
+                SystemMessage(content=HISTORY_SUMMARY_PROMPT),
+                HumanMessage(content=transcript),
+            ])
+            self._history_summary = response.content
+            self._dropped_messages = []
+    
+    def _graph_config(self) -> dict:
+        """Config selecting this assistant's checkpointed thread."""
+        return self.agent.thread_config(self.thread_id)
+    
+    def _reset_thread(self):
+        """Start a new checkpoint thread and drop the old one from the checkpointer."""
+        if self.agent:
+            self.agent.graph.checkpointer.delete_thread(self.thread_id)
+        self.thread_id = uuid.uuid4().hex
+        self._thread_prefix_len = 0
+    
+    async def _build_graph_input(self, message: str) -> dict:
+        """
+        Build the graph input for a new user message.
+        
+        Normally only the new HumanMessage is sent; the checkpointer already holds the
+        rest of the thread. If trimming drops turns, the thread is rebased onto a fresh
+        thread_id seeded with the summary and the remaining history.
+        """
+        human = HumanMessage(content=message)
+        self.conversation_history = self.conversation_history + [human]
+        before = len(self.conversation_history)
+        await self._trim_history()
+        if len(self.conversation_history) == before:
+            return {"messages": [human]}
+        
+        self._reset_thread()
+        messages = list(self.conversation_history)
+        if self._history_summary:
+            messages.insert(0, SystemMessage(content=f"Earlier context: {self._history_summary}"))
+            self._thread_prefix_len = 1
+        return {"messages": messages}
+    
     async def chat(self, message: str) -> str:
         """
         Send a message and get a response. Maintains conversation history.
@@ -256,18 +683,47 @@ class ResearchAssistant:
         if not self._initialized or not self.agent:
             return "Error: Assistant not initialized. Call initialize() first."
         
-        # Add user message to history
-        self.conversation_history.append(HumanMessage(content=message))
+        graph_input = await self._build_graph_input(message)
+        result = await self.agent.graph.ainvoke(graph_input, config=self._graph_config())
         
-        # Invoke agent with full conversation history
-        result = await self.agent.graph.ainvoke({"messages": self.conversation_history})
-        
-        # Update history with all new messages (including tool calls)
-        self.conversation_history = result['messages']
+        # Mirror the checkpointed thread (including tool calls), minus the summary prefix
+        self.conversation_history = result['messages'][self._thread_prefix_len:]
         
         # Return the final response
         return result['messages'][-1].content
     
+    async def chat_stream(self, message: str) -> AsyncIterator[str]:
+        """
+        Send a message and stream the response as text deltas. Maintains conversation history.
+        
+        Args:
+            message: User's message
+            
+        Yields:
+            Chunks of the agent's response text as they are generated
+        """
+        if not self._initialized or not self.agent:
+            yield "Error: Assistant not initialized. Call initialize() first."
+            return
+        
+        graph_input = await self._build_graph_input(message)
+        
+        final_state = None
+        async for event in self.agent.graph.astream_events(
+            graph_input, config=self._graph_config(), version="v2"
+        ):
+            kind = event["event"]
+            if kind == "on_chat_model_stream":
+                content = event["data"]["chunk"].content
+                if content and isinstance(content, str):
+                    yield content
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                # Top-level graph finished: its output is the final agent state
+                final_state = event["data"].get("output")
+        
+        if final_state and "messages" in final_state:
+            self.conversation_history = final_state["messages"][self._thread_prefix_len:]
+    
     async def chat_single(self, message: str) -> str:
         """
         Send a single message without conversation history.
@@ -281,17 +737,36 @@ class ResearchAssistant:
         if not self._initialized or not self.agent:
             return "Error: Assistant not initialized. Call initialize() first."
         
-        result = await self.agent.graph.ainvoke({"messages": [HumanMessage(content=message)]})
+        thread_id = uuid.uuid4().hex
+        try:
+            result = await self.agent.graph.ainvoke(
+                {"messages": [HumanMessage(content=message)]},
+                config=self.agent.thread_config(thread_id)
+            )
+        finally:
+            self.agent.graph.checkpointer.delete_thread(thread_id)
         return result['messages'][-1].content
     
     def clear_history(self):
-        """Clear conversation history."""
+        """Clear conversation history by moving to a new checkpoint thread."""
+        self._reset_thread()
         self.conversation_history = []
+        self._dropped_messages = []
+        self._history_summary = None
     
     async def close(self):
-        """Close connections and cleanup."""
-        if self.mcp_manager:
-            await self.mcp_manager.close()
+        """
+        Close connections and cleanup. The MCP connection may be shared with cache-hit
+        instances: it is only closed once the last instance using it closes.
+        """
+        async with _RA_LOCK:
+            if _RA_CACHE.get(self.mcp_server_url) is self:
+                del _RA_CACHE[self.mcp_server_url]
+            manager, self.mcp_manager, self.session = self.mcp_manager, None, None
+            if manager:
+                manager.users -= 1
+                if manager.users <= 0:
+                    await manager.close()
         self._initialized = False
         self.agent = None
         self.tools = []
@@ -3,31 +3,51 @@ Research Assistant API - FastAPI backend for the Research Assistant Agent.
 
 Endpoints:
 - POST /chat - Send a message and get a response (maintains conversation)
+- POST /chat/stream - Send a message and stream the response as Server-Sent Events
 - POST /chat/single - Send a single message without history
 - POST /clear - Clear conversation history
 - GET /health - Health check
 - GET /status - Get assistant status
+- GET /cache/stats - Get assistant cache statistics
 """
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 from contextlib import asynccontextmanager
+from functools import cache
+from types import SimpleNamespace
 import sys
 import os
+import json
 from pathlib import Path
 from dotenv import load_dotenv, find_dotenv
-load_dotenv(find_dotenv())
 
 # Add Agent SetUp to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "Agent SetUp"))
-from agent import ResearchAssistant
+
+# The agent pulls in the LangChain/LangGraph/MCP stack, so it is imported in lifespan
+if TYPE_CHECKING:
+    from agent import ResearchAssistant
+
+
+# ============== Configuration ==============
+
+@cache
+def _env() -> SimpleNamespace:
+    """Load .env once and snapshot the settings the API needs."""
+    load_dotenv(find_dotenv(usecwd=True))
+    return SimpleNamespace(
+        MCP_URL=os.getenv("MCP_SERVER_URL", "http://127.0.0.1:8787/sse"),
+        MODEL=os.getenv("MODEL_NAME", "gpt-4o-mini")
+    )
 
 
 # ============== Global State ==============
 
-assistant: Optional[ResearchAssistant] = None
+assistant: Optional["ResearchAssistant"] = None
 
 
 # ============== Lifespan Management ==============
@@ -38,11 +58,14 @@ async def lifespan(app: FastAPI):
     global assistant
     
     print("🚀 Starting Research Assistant API...")
+    # Load .env before importing the agent, which reads the environment at import time
+    env = _env()
+    from agent import ResearchAssistant
     
     # Initialize the research assistant
     assistant = ResearchAssistant(
-        mcp_server_url=os.getenv("MCP_SERVER_URL", "http://127.0.0.1:8787/sse"),
-        model_name=os.getenv("MODEL_NAME", "gpt-4o-mini")
+        mcp_server_url=env.MCP_URL,
+        model_name=env.MODEL
     )
     
     success = await assistant.initialize()
@@ -95,6 +118,7 @@ class ChatResponse(BaseModel):
 
 class StatusResponse(BaseModel):
     """Response model for status endpoint."""
+    healthy: bool = Field(default=True, description="API is up (always true when this endpoint answers)")
     is_ready: bool
     mcp_connected: bool
     tools_loaded: int
@@ -111,7 +135,7 @@ async def health_check():
 
 @app.get("/status", response_model=StatusResponse)
 async def get_status():
-    """Get the current status of the research assistant."""
+    """Get the current status of the research assistant (also serves as the health check)."""
     if not assistant:
         return StatusResponse(
             is_ready=False,
@@ -128,6 +152,13 @@ async def get_status():
     )
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Get hit/miss statistics for the process-wide assistant cache."""
+    from agent import get_cache_stats
+    return get_cache_stats()
+
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """
@@ -156,6 +187,33 @@ async def chat(request: ChatRequest):
         )
 
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Send a message to the assistant and stream the response (maintains conversation history).
+    
+    Emits Server-Sent Events frames of the form `data: {...}`:
+    - `{"delta": "..."}` for each chunk of generated text
+    - `{"done": true}` once the response is complete
+    - `{"error": "..."}` if the agent run fails
+    """
+    if not assistant or not assistant.is_ready:
+        raise HTTPException(
+            status_code=503, 
+            detail="Research Assistant not initialized. Make sure MCP server is running."
+        )
+    
+    async def event_generator():
+        try:
+            async for delta in assistant.chat_stream(request.message):
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+            yield f"data: {json.dumps({'done': True})}\n\n"
+        except Exception as e:
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+    
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+
 @app.post("/clear")
 async def clear_history():
     """Clear the conversation history."""
@@ -3,12 +3,15 @@ Research Assistant Frontend - Streamlit UI
 A beautiful, animated interface for the Research Assistant Agentic System.
 """
 import os
+import re
 import streamlit as st
-import requests
-import json
+import httpx
+import orjson
 import time
 import uuid
-from typing import Optional
+import threading
+from contextlib import contextmanager
+from typing import Optional, Iterator
 
 # ============== Page Configuration ==============
 
@@ -22,14 +25,23 @@ st.set_page_config(
 # ============== Configuration ==============
 
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
-HEALTH_ENDPOINT = f"{API_BASE_URL}/health"
 STATUS_ENDPOINT = f"{API_BASE_URL}/status"
 CHAT_ENDPOINT = f"{API_BASE_URL}/chat"
+CHAT_STREAM_ENDPOINT = f"{API_BASE_URL}/chat/stream"
 CLEAR_ENDPOINT = f"{API_BASE_URL}/clear"
 
+# Headers for JSON request bodies (orjson bytes), built once
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Seconds between background health/status polls
+STATUS_POLL_SECONDS = 5
+
+# Minimum seconds between re-renders of a streaming response
+STREAM_FLUSH_SECONDS = 0.05
+
 # ============== Custom CSS for Theme Support ==============
 
-st.markdown("""
+THEME_CSS = """
 <style>
     /* ========== COLOR PALETTE ==========
        Using CSS media queries to support both light and dark browser themes
@@ -199,6 +211,17 @@ st.markdown("""
     }
     
     /* Feature cards */
+    .feature-grid {
+        display: grid;
+        grid-template-columns: repeat(4, minmax(0, 1fr));
+    }
+    
+    @media (max-width: 768px) {
+        .feature-grid {
+            grid-template-columns: repeat(2, minmax(0, 1fr));
+        }
+    }
+    
     .feature-card {
         background: #1e293b;
         padding: 1.5rem 1rem;
@@ -232,6 +255,13 @@ st.markdown("""
         font-size: 0.8rem;
     }
     
+    /* Pending assistant reply */
+    .typing-indicator {
+        color: #94a3b8;
+        font-size: 1.25rem;
+        animation: pulse 1.2s ease-in-out infinite;
+    }
+    
     /* Chat message containers */
     .stChatMessage {
         background: #1e293b !important;
@@ -263,6 +293,37 @@ st.markdown("""
         border: 1px solid rgba(255, 255, 255, 0.1) !important;
     }
     
+    /* Replayed history bubbles (one markdown element, styled like chat messages) */
+    .history-message {
+        background: #252542;
+        border-radius: 12px;
+        border: 1px solid rgba(255, 255, 255, 0.1);
+        margin: 0.75rem 0;
+        padding: 0.75rem 1rem;
+        color: #ffffff;
+    }
+    
+    .history-message::before {
+        display: block;
+        color: #94a3b8;
+        font-size: 0.75rem;
+        font-weight: 600;
+        margin-bottom: 0.25rem;
+    }
+    
+    .history-user {
+        background: linear-gradient(135deg, #1e3a5f 0%, #2a4a6f 100%);
+        border: 1px solid rgba(91, 108, 255, 0.3);
+    }
+    
+    .history-user::before {
+        content: "You";
+    }
+    
+    .history-assistant::before {
+        content: "Assistant";
+    }
+    
     /* Chat input styling */
     [data-testid="stChatInput"] {
         background: transparent !important;
@@ -458,6 +519,17 @@ st.markdown("""
             color: #1e293b !important;
         }
         
+        .history-message {
+            background: #f8fafc;
+            border: 1px solid #e2e8f0;
+            color: #1e293b;
+        }
+        
+        .history-user {
+            background: linear-gradient(135deg, #eff6ff 0%, #dbeafe 100%);
+            border: 1px solid #bfdbfe;
+        }
+        
         .stChatMessage[data-testid="stChatMessageUser"] {
             background: linear-gradient(135deg, #eff6ff 0%, #dbeafe 100%) !important;
             border: 1px solid #bfdbfe !important;
@@ -520,53 +592,201 @@ st.markdown("""
         }
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+@st.cache_resource(show_spinner=False)
+def minify_css(css: str) -> str:
+    """
+    Strip comments and redundant whitespace from a stylesheet. Cached with
+    st.cache_resource because the script re-executes on every rerun, which would
+    reset an lru_cache.
+    """
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};:,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+def inject_theme():
+    """
+    Emit the theme stylesheet. Streamlit drops elements a rerun does not re-emit,
+    so this runs every rerun; the minified CSS is computed once per process.
+    """
+    st.markdown(minify_css(THEME_CSS), unsafe_allow_html=True)
+
+# ============== Static HTML ==============
+
+WELCOME_HTML = """
+<div class="welcome-container">
+    <h2>Welcome to Research Assistant</h2>
+    <p>I'm here to help you explore and understand research papers.</p>
+    <p style="margin-top: 1rem; color: #a0a0b0;">Start by asking me a question below...</p>
+</div>
+"""
+
+# Feature cards - Monochrome icons, laid out by .feature-grid in a single element
+FEATURE_CARDS_HTML = """
+<div class="feature-grid">
+    <div class="feature-card">
+        <div class="feature-icon">🔍</div>
+        <p class="feature-title">Search</p>
+        <p class="feature-desc">Query the knowledge base</p>
+    </div>
+    <div class="feature-card">
+        <div class="feature-icon">📄</div>
+        <p class="feature-title">Discover</p>
+        <p class="feature-desc">Find papers on arXiv</p>
+    </div>
+    <div class="feature-card">
+        <div class="feature-icon">📥</div>
+        <p class="feature-title">Download</p>
+        <p class="feature-desc">Add papers to index</p>
+    </div>
+    <div class="feature-card">
+        <div class="feature-icon">💬</div>
+        <p class="feature-title">Chat</p>
+        <p class="feature-desc">Get cited answers</p>
+    </div>
+</div>
+"""
 
 # ============== Helper Functions ==============
 
-def check_health() -> bool:
-    """Check if the API is healthy."""
-    try:
-        response = requests.get(HEALTH_ENDPOINT, timeout=2)
-        return response.status_code == 200
-    except:
-        return False
+@st.cache_resource
+def get_http() -> httpx.Client:
+    """
+    Shared HTTP client whose keep-alive connection pool survives Streamlit reruns.
+    
+    trust_env=False skips proxy/.netrc environment parsing on every request; pooled
+    connections mean the backend host is only resolved when a new connection is opened.
+    """
+    return httpx.Client(
+        base_url=API_BASE_URL,
+        trust_env=False,
+        timeout=httpx.Timeout(120.0, connect=2.0),
+        transport=httpx.HTTPTransport(
+            http2=True,
+            retries=0,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4)
+        )
+    )
 
-def get_status() -> Optional[dict]:
+def get_status(http: httpx.Client) -> Optional[dict]:
     """Get the current status of the assistant."""
     try:
-        response = requests.get(STATUS_ENDPOINT, timeout=2)
+        response = http.get(STATUS_ENDPOINT, timeout=2)
         if response.status_code == 200:
-            return response.json()
-    except:
+            return orjson.loads(response.content)
+    except (httpx.HTTPError, httpx.InvalidURL, orjson.JSONDecodeError):
+        # An unreadable payload means the same as no reply: the backend is reported unreachable
         pass
     return None
 
-def send_message(message: str) -> Optional[dict]:
-    """Send a message to the chat endpoint."""
+class StatusPoller:
+    """
+    Polls backend health/status on a daemon thread so reruns only read cached values.
+    st.session_state is not thread-safe, so results are kept here behind a lock and
+    copied into the session state at the top of each script run.
+    """
+
+    def __init__(self, http: httpx.Client, interval: float):
+        self._http = http
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._snapshot = {"is_healthy": False, "status": None, "checked_at": 0.0}
+        # Number of chat requests currently streaming (across all sessions)
+        self._in_flight = 0
+
+    def poll(self):
+        # /status reports health alongside the metrics, so /health is not probed separately
+        status = get_status(self._http)
+        is_healthy = bool(status and status.get("healthy", True))
+        with self._lock:
+            self._snapshot = {"is_healthy": is_healthy, "status": status, "checked_at": time.time()}
+
+    def run(self):
+        while True:
+            time.sleep(self._interval)
+            # Nobody is looking at the status metrics while waiting for an answer
+            if not self._in_flight:
+                self.poll()
+
+    @contextmanager
+    def in_flight_chat(self):
+        """Pause background polling while a chat response is streaming."""
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._snapshot)
+
+@st.cache_resource
+def start_status_poller(_http: httpx.Client) -> StatusPoller:
+    """Start the single process-wide status poller (first poll runs synchronously)."""
+    poller = StatusPoller(_http, STATUS_POLL_SECONDS)
+    poller.poll()
+    threading.Thread(target=poller.run, daemon=True).start()
+    return poller
+
+def refresh_status():
+    """Re-probe the backend now instead of waiting for the next background poll."""
+    start_status_poller(get_http()).poll()
+
+def stream_message(message: str) -> Iterator[dict]:
+    """Send a message to the streaming chat endpoint and yield its SSE events."""
     try:
-        response = requests.post(
-            CHAT_ENDPOINT,
-            json={"message": message},
+        with get_http().stream(
+            "POST",
+            CHAT_STREAM_ENDPOINT,
+            content=orjson.dumps({"message": message}),
+            headers=JSON_HEADERS,
             timeout=120  # Long timeout for agent processing
-        )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return {"success": False, "error": f"HTTP {response.status_code}: {response.text}"}
-    except requests.exceptions.Timeout:
-        return {"success": False, "error": "Request timed out. The agent may be processing a complex query."}
+        ) as response:
+            if response.status_code != 200:
+                response.read()
+                yield {"error": f"HTTP {response.status_code}: {response.text}"}
+                return
+            for line in response.iter_lines():
+                if line and line.startswith("data: "):
+                    yield orjson.loads(line[len("data: "):])
+    except httpx.TimeoutException:
+        yield {"error": "Request timed out. The agent may be processing a complex query."}
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        yield {"error": str(e)}
 
 def clear_history():
     """Clear the conversation history."""
     try:
-        response = requests.post(CLEAR_ENDPOINT, timeout=5)
+        response = get_http().post(CLEAR_ENDPOINT, timeout=5)
         return response.status_code == 200
-    except:
+    except (httpx.HTTPError, httpx.InvalidURL):
         return False
 
+# ============== Chat History Rendering ==============
+
+# Fenced blocks and inline code spans, which markdown already shows literally
+_CODE_RE = re.compile(r"(```.*?```|`[^`\n]*`)", re.S)
+
+def _escape_html(text: str) -> str:
+    """Escape raw HTML outside code so message text is never rendered as markup."""
+    parts = _CODE_RE.split(text)
+    return "".join(part if i % 2 else part.replace("<", "&lt;") for i, part in enumerate(parts))
+
+def render_history(messages: list) -> str:
+    """
+    Build one markdown document holding every past message as a styled bubble.
+    Blank lines around the content keep it parsed as markdown inside the wrapper.
+    """
+    return "\n\n".join(
+        f'<div class="history-message history-{m["role"]}">\n\n{_escape_html(m["content"])}\n\n</div>'
+        for m in messages
+    )
+
 # ============== Initialize Session State ==============
 
 if "messages" not in st.session_state:
@@ -575,11 +795,43 @@ if "messages" not in st.session_state:
 if "status" not in st.session_state:
     st.session_state.status = None
 
-if "last_status_check" not in st.session_state:
-    st.session_state.last_status_check = 0
-
 if "session_id" not in st.session_state:
-    st.session_state.session_id = str(uuid.uuid4())
+    # Round-trip the id through the URL so a page reload keeps the same session
+    st.session_state.session_id = st.query_params.get("sid") or str(uuid.uuid4())
+    st.query_params["sid"] = st.session_state.session_id
+
+# Copy the latest background poll results into this session
+_status_snapshot = start_status_poller(get_http()).snapshot()
+st.session_state.is_healthy = _status_snapshot["is_healthy"]
+st.session_state.status = _status_snapshot["status"]
+
+# ============== Connection Check ==============
+
+# While the backend is down, render only a small unstyled error page and stop
+# before the theme, sidebar and welcome content are built
+if not st.session_state.is_healthy:
+    st.markdown("""
+    <div style="text-align: center; padding: 2rem 1rem;">
+        <h2 style="color: #ff6b6b;">Cannot Connect to Backend</h2>
+        <p>The backend server is not responding. Please start the servers.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.markdown("""
+    **To start the backend:**
+    1. Open a terminal in the `Tools Server` directory
+    2. Run: `python McpServer.py` (keep this running)
+    3. Open another terminal in the `Agentic System` directory  
+    4. Run: `python main.py` or `uvicorn main:app --reload`
+    5. Wait for both servers to start, then refresh this page
+    """)
+    
+    if st.button("Retry Connection"):
+        refresh_status()
+        st.rerun()
+    st.stop()
+
+inject_theme()
 
 # ============== Sidebar ==============
 
@@ -589,40 +841,27 @@ with st.sidebar:
     # Status Section
     st.markdown("### SYSTEM STATUS")
     
-    # Check health
-    is_healthy = check_health()
-    
-    if is_healthy:
-        st.markdown('<p class="status-connected"><span style="color: #00d4aa;">●</span> Connected</p>', unsafe_allow_html=True)
-        
-        # Get detailed status
-        status = get_status()
-        if status:
-            st.session_state.status = status
-            
-            # Status metrics in a clean card
-            st.markdown('<div class="status-card">', unsafe_allow_html=True)
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                ready_status = "●" if status.get("is_ready") else "○"
-                ready_color = "#00d4aa" if status.get("is_ready") else "#a0a0b0"
-                st.markdown(f'<p style="color: #a0a0b0; font-size: 0.75rem; margin-bottom: 2px;">Ready</p><p style="color: {ready_color}; font-size: 1.1rem; font-weight: 600;">{ready_status}</p>', unsafe_allow_html=True)
-            with col2:
-                mcp_status = "●" if status.get("mcp_connected") else "○"
-                mcp_color = "#00d4aa" if status.get("mcp_connected") else "#a0a0b0"
-                st.markdown(f'<p style="color: #a0a0b0; font-size: 0.75rem; margin-bottom: 2px;">MCP</p><p style="color: {mcp_color}; font-size: 1.1rem; font-weight: 600;">{mcp_status}</p>', unsafe_allow_html=True)
-            
-            col3, col4 = st.columns(2)
-            with col3:
-                st.markdown(f'<p style="color: #a0a0b0; font-size: 0.75rem; margin-bottom: 2px;">Tools</p><p style="color: #00d4aa; font-size: 1.1rem; font-weight: 600;">{status.get("tools_loaded", 0)}</p>', unsafe_allow_html=True)
-            with col4:
-                st.markdown(f'<p style="color: #a0a0b0; font-size: 0.75rem; margin-bottom: 2px;">Messages</p><p style="color: #00d4aa; font-size: 1.1rem; font-weight: 600;">{status.get("conversation_length", 0)}</p>', unsafe_allow_html=True)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
-    else:
-        st.markdown('<p class="status-disconnected"><span>●</span> Disconnected</p>', unsafe_allow_html=True)
-        st.warning("Cannot connect to the API server.")
+    # Only reached while the most recent background poll succeeded
+    st.markdown('<p class="status-connected"><span style="color: #00d4aa;">●</span> Connected</p>', unsafe_allow_html=True)
+    
+    # Get detailed status
+    status = st.session_state.status
+    if status:
+        # Status metrics in a clean card, laid out as one 2x2 grid element
+        ready_status = "●" if status.get("is_ready") else "○"
+        ready_color = "#00d4aa" if status.get("is_ready") else "#a0a0b0"
+        mcp_status = "●" if status.get("mcp_connected") else "○"
+        mcp_color = "#00d4aa" if status.get("mcp_connected") else "#a0a0b0"
+        label_style = "color: #a0a0b0; font-size: 0.75rem; margin-bottom: 2px;"
+        value_style = "font-size: 1.1rem; font-weight: 600;"
+        st.markdown(f"""
+        <div class="status-card" style="display: grid; grid-template-columns: 1fr 1fr; gap: 0.5rem;">
+            <div><p style="{label_style}">Ready</p><p style="color: {ready_color}; {value_style}">{ready_status}</p></div>
+            <div><p style="{label_style}">MCP</p><p style="color: {mcp_color}; {value_style}">{mcp_status}</p></div>
+            <div><p style="{label_style}">Tools</p><p style="color: #00d4aa; {value_style}">{status.get("tools_loaded", 0)}</p></div>
+            <div><p style="{label_style}">Messages</p><p style="color: #00d4aa; {value_style}">{status.get("conversation_length", 0)}</p></div>
+        </div>
+        """, unsafe_allow_html=True)
     
     st.markdown("---")
     
@@ -632,48 +871,46 @@ with st.sidebar:
     if st.button("Clear Conversation", use_container_width=True):
         if clear_history():
             st.session_state.messages = []
-            st.success("History cleared!")
-            time.sleep(0.5)
+            refresh_status()
+            st.toast("History cleared!")
             st.rerun()
         else:
             st.error("Failed to clear history.")
     
     if st.button("New Session", use_container_width=True):
         st.session_state.session_id = str(uuid.uuid4())
+        st.query_params["sid"] = st.session_state.session_id
         st.session_state.messages = []
-        st.success("New session started!")
-        time.sleep(0.5)
+        refresh_status()
+        st.toast("New session started!")
         st.rerun()
     
     st.markdown("---")
     
-    # Session Info
-    st.markdown("### SESSION INFO")
-    st.markdown(f"""
-    <div class="status-card">
-        <p style="font-size: 10px; word-break: break-all; color: #a0a0b0; font-family: monospace;">
-            {st.session_state.session_id}
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    st.markdown("---")
+    # Session Info and About stay collapsed unless the user opens them
+    with st.expander("Session Info", expanded=False):
+        st.markdown(f"""
+        <div class="status-card">
+            <p style="font-size: 10px; word-break: break-all; color: #a0a0b0; font-family: monospace;">
+                {st.session_state.session_id}
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
     
-    # About Section
-    st.markdown("### ABOUT")
-    st.markdown("""
-    <div class="status-card">
-        <p style="font-size: 13px; color: #ffffff; margin-bottom: 8px;">
-            <strong>Research Assistant</strong>
-        </p>
-        <ul style="font-size: 12px; padding-left: 1.2rem; color: #a0a0b0; margin: 0;">
-            <li>Search research papers</li>
-            <li>Find papers on arXiv</li>
-            <li>Download & index papers</li>
-            <li>Get cited answers</li>
-        </ul>
-    </div>
-    """, unsafe_allow_html=True)
+    with st.expander("About", expanded=False):
+        st.markdown("""
+        <div class="status-card">
+            <p style="font-size: 13px; color: #ffffff; margin-bottom: 8px;">
+                <strong>Research Assistant</strong>
+            </p>
+            <ul style="font-size: 12px; padding-left: 1.2rem; color: #a0a0b0; margin: 0;">
+                <li>Search research papers</li>
+                <li>Find papers on arXiv</li>
+                <li>Download & index papers</li>
+                <li>Get cited answers</li>
+            </ul>
+        </div>
+        """, unsafe_allow_html=True)
     
     st.markdown("---")
     st.caption("Made with ❤️ using Streamlit")
@@ -690,78 +927,15 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Check connection before allowing chat
-if not is_healthy:
-    st.markdown("""
-    <div class="welcome-container" style="border-color: #ff6b6b;">
-        <h2 style="color: #ff6b6b !important;">Cannot Connect to Backend</h2>
-        <p>The backend server is not responding. Please start the servers.</p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    st.markdown("""
-    **To start the backend:**
-    1. Open a terminal in the `Tools Server` directory
-    2. Run: `python McpServer.py` (keep this running)
-    3. Open another terminal in the `Agentic System` directory  
-    4. Run: `python main.py` or `uvicorn main:app --reload`
-    5. Wait for both servers to start, then refresh this page
-    """)
-    st.stop()
-
 # Welcome message when no messages
 if not st.session_state.messages:
-    st.markdown("""
-    <div class="welcome-container">
-        <h2>Welcome to Research Assistant</h2>
-        <p>I'm here to help you explore and understand research papers.</p>
-        <p style="margin-top: 1rem; color: #a0a0b0;">Start by asking me a question below...</p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Feature cards - Monochrome icons
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown("""
-        <div class="feature-card">
-            <div class="feature-icon">🔍</div>
-            <p class="feature-title">Search</p>
-            <p class="feature-desc">Query the knowledge base</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown("""
-        <div class="feature-card">
-            <div class="feature-icon">📄</div>
-            <p class="feature-title">Discover</p>
-            <p class="feature-desc">Find papers on arXiv</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown("""
-        <div class="feature-card">
-            <div class="feature-icon">📥</div>
-            <p class="feature-title">Download</p>
-            <p class="feature-desc">Add papers to index</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col4:
-        st.markdown("""
-        <div class="feature-card">
-            <div class="feature-icon">💬</div>
-            <p class="feature-title">Chat</p>
-            <p class="feature-desc">Get cited answers</p>
-        </div>
-        """, unsafe_allow_html=True)
+    st.markdown(WELCOME_HTML, unsafe_allow_html=True)
+    st.markdown(FEATURE_CARDS_HTML, unsafe_allow_html=True)
 
-# Display chat messages
-for message in st.session_state.messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+# Display past messages as a single element; only the live exchange uses st.chat_message
+history_container = st.container()
+if st.session_state.messages:
+    history_container.markdown(render_history(st.session_state.messages), unsafe_allow_html=True)
 
 # Chat input
 if prompt := st.chat_input("Ask me anything about research papers..."):
@@ -770,18 +944,33 @@ if prompt := st.chat_input("Ask me anything about research papers..."):
     with st.chat_message("user"):
         st.markdown(prompt)
     
-    # Get assistant response
+    # Get assistant response, rendering tokens as they stream in
     with st.chat_message("assistant"):
-        with st.spinner("Researching..."):
-            response = send_message(prompt)
-        
-        if response and response.get("success"):
-            assistant_response = response.get("response", "No response received.")
-            st.markdown(assistant_response)
+        # Show a pulsing placeholder right away; streamed tokens overwrite it
+        placeholder = st.empty()
+        placeholder.markdown('<span class="typing-indicator">…</span>', unsafe_allow_html=True)
+        buf = ""
+        error_msg = None
+        last_flush = 0.0
+        with st.spinner("Researching..."), start_status_poller(get_http()).in_flight_chat():
+            for event in stream_message(prompt):
+                if event.get("error"):
+                    error_msg = event["error"]
+                    break
+                if event.get("delta"):
+                    buf += event["delta"]
+                    # Batch tokens so the markdown element is re-rendered at most every 50 ms
+                    now = time.monotonic()
+                    if now - last_flush > STREAM_FLUSH_SECONDS:
+                        placeholder.markdown(buf)
+                        last_flush = now
+        
+        if error_msg is None:
+            assistant_response = buf or "No response received."
+            placeholder.markdown(assistant_response)
             st.session_state.messages.append({"role": "assistant", "content": assistant_response})
         else:
-            error_msg = response.get("error", "Unknown error occurred.") if response else "No response from server."
-            st.error(f"**Error:** {error_msg}")
+            placeholder.error(f"**Error:** {error_msg}")
             st.markdown("""
             <div class="status-card" style="margin-top: 1rem;">
                 <p style="color: #ffffff; font-weight: 600; margin-bottom: 8px;">Tips:</p>
@@ -5,10 +5,16 @@ Provides the following tools:
 1. research_paper_probe - Search and query research papers in the RAG database
 2. search_arxiv - Search arXiv for academic papers
 3. download_paper - Download PDF papers and auto-index them in the vector database
-4. generate_report - Generate a PDF report from markdown content
+4. download_papers - Download several papers concurrently and index them in one batch
+5. generate_report - Generate a PDF report from markdown content
 """
 import os
 import sys
+import asyncio
+import functools
+import inspect
+import sqlite3
+from contextlib import closing
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 from datetime import datetime
@@ -16,6 +22,7 @@ from datetime import datetime
 from mcp.server.fastmcp import FastMCP
 from pydantic import ValidationError, BaseModel, Field
 from markdown_pdf import MarkdownPdf, Section
+import orjson
 
 # Setup environment
 from dotenv import load_dotenv, find_dotenv
@@ -37,7 +44,8 @@ from corpus_expansion import (
     SearchArxivArgs,
     DownloadPdfArgs,
     search_arxiv,
-    download_pdf
+    download_pdf_async,
+    download_papers
 )
 
 import openai
@@ -51,8 +59,58 @@ mcp = FastMCP(
 )
 
 
+def json_tool(**tool_kwargs):
+    """
+    Register an MCP tool whose dict result is sent as compact orjson text.
+    FastMCP would otherwise emit the result twice (indented text plus a schema-validated
+    structuredContent copy); the agent only reads the text.
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                return orjson.dumps(await fn(*args, **kwargs), default=str).decode()
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                return orjson.dumps(fn(*args, **kwargs), default=str).decode()
+        return mcp.tool(structured_output=False, **tool_kwargs)(wrapper)
+    return decorator
+
+
 # ============== Startup Initialization ==============
 
+# Largest collection for which the full-metadata fallback scan is still run at startup
+UNIQUE_PAPER_SCAN_MAX_CHUNKS = 5000
+
+
+def _count_unique_papers(collection, chunk_count: int) -> Optional[int]:
+    """
+    Count distinct paper titles with one SQL query against Chroma's sqlite store,
+    falling back to a metadata scan if the internal schema is not what we expect.
+    Returns None when the fallback would have to scan a large collection.
+    """
+    try:
+        with closing(sqlite3.connect(rag_tool.persist_directory / "chroma.sqlite3")) as conn:
+            (count,) = conn.execute(
+                """
+                SELECT COUNT(DISTINCT m.string_value)
+                FROM embedding_metadata m
+                JOIN embeddings e ON e.id = m.id
+                JOIN segments s ON s.id = e.segment_id
+                JOIN collections c ON c.id = s.collection
+                WHERE m.key = 'paper_title' AND c.name = ?
+                """,
+                (rag_tool.collection_name,)
+            ).fetchone()
+        return count
+    except sqlite3.Error:
+        if chunk_count >= UNIQUE_PAPER_SCAN_MAX_CHUNKS:
+            return None
+        result = collection.get(include=["metadatas"])
+        return len({m["paper_title"] for m in result.get("metadatas", []) if m and "paper_title" in m})
+
+
 def initialize_rag_on_startup():
     """
     Initialize the RAG system at server startup.
@@ -76,12 +134,11 @@ def initialize_rag_on_startup():
                 print(f"✓ VectorDB loaded with {count} document chunks")
                 
                 # Get unique papers
-                result = collection.get(include=["metadatas"])
-                unique_papers = set()
-                for metadata in result.get("metadatas", []):
-                    if metadata and "paper_title" in metadata:
-                        unique_papers.add(metadata["paper_title"])
-                print(f"✓ {len(unique_papers)} unique papers indexed")
+                unique_papers = _count_unique_papers(collection, count)
+                if unique_papers is None:
+                    print(f"✓ {count} chunks (unique-paper count skipped for perf)")
+                else:
+                    print(f"✓ {unique_papers} unique papers indexed")
                 
             except Exception as e:
                 print(f"✓ VectorDB initialized (could not get stats: {e})")
@@ -100,13 +157,14 @@ def initialize_rag_on_startup():
 
 # ============== Tool 1: Research Paper Probe (RAG) ==============
 
-@mcp.tool(
+@json_tool(
     name="research_paper_probe",
     description=(
         "Search AI research papers in the knowledge base to answer questions. "
         "Filters available: topic ('Agentic AI', 'Finetuning', 'Hierarchical Reasoning Models', 'Deep Learning'), "
         "year (publication year), subject (e.g., 'Artificial Intelligence'). "
-        "Returns: topic, category, response (markdown), sources with paper titles and pages, confidence score."
+        "Returns: topic, category, response (markdown), sources with paper titles and pages, confidence score. "
+        "Near-identical repeat questions are answered from cache; set bypass_cache=True to force fresh retrieval."
     ),
 )
 def mcp_research_probe(
@@ -115,6 +173,7 @@ def mcp_research_probe(
     subject: Optional[str] = None,
     year: Optional[int] = None,
     k: int = 10,
+    bypass_cache: bool = False,
 ) -> Dict[str, Any]:
     """
     Search research papers and return structured response.
@@ -125,7 +184,8 @@ def mcp_research_probe(
             topic=topic,
             subject=subject,
             year=year,
-            k=k
+            k=k,
+            bypass_cache=bypass_cache
         )
     except ValidationError as e:
         return {"error": "validation_error", "details": e.errors()}
@@ -135,12 +195,13 @@ def mcp_research_probe(
 
 # ============== Tool 2: Search arXiv ==============
 
-@mcp.tool(
+@json_tool(
     name="search_arxiv",
     description=(
         "Search arXiv for academic papers. "
         "Returns a list of papers with title, abstract, authors, year, pdf_url, subject, and topic. "
-        "Use subject and topic to organize results (e.g., subject='Artificial Intelligence', topic='Healthcare')."
+        "Use subject and topic to organize results (e.g., subject='Artificial Intelligence', topic='Healthcare'). "
+        "Repeated identical searches are cached for an hour; set force_refresh=True to query arXiv again."
     ),
 )
 def mcp_search_arxiv(
@@ -148,6 +209,7 @@ def mcp_search_arxiv(
     subject: Optional[str] = None,
     topic: Optional[str] = None,
     max_results: int = 10,
+    force_refresh: bool = False,
 ) -> Dict[str, Any]:
     """
     Search arXiv for papers matching the query.
@@ -157,7 +219,8 @@ def mcp_search_arxiv(
             query=query,
             subject=subject,
             topic=topic,
-            max_results=max_results
+            max_results=max_results,
+            force_refresh=force_refresh
         )
     except ValidationError as e:
         return {"error": "validation_error", "details": e.errors()}
@@ -165,9 +228,9 @@ def mcp_search_arxiv(
     return search_arxiv(**args.model_dump())
 
 
-# ============== Tool 3: Download Paper ==============
+# ============== Tool 3: Download Paper(s) ==============
 
-@mcp.tool(
+@json_tool(
     name="download_paper",
     description=(
         "Download a PDF paper from arXiv and automatically add it to the RAG vector database. "
@@ -175,7 +238,7 @@ def mcp_search_arxiv(
         "Papers are saved to: Papers/subject/topic/title - year.pdf and indexed for future queries."
     ),
 )
-def mcp_download_paper(
+async def mcp_download_paper(
     pdf_url: str,
     title: str,
     year: Optional[int] = None,
@@ -198,16 +261,54 @@ def mcp_download_paper(
     except ValidationError as e:
         return {"error": "validation_error", "details": e.errors()}
 
-    return download_pdf(**args.model_dump())
+    return await download_pdf_async(**args.model_dump())
+
+
+@json_tool(
+    name="download_papers",
+    description=(
+        "Download several PDF papers at once and add them to the RAG vector database. "
+        "Each item takes the same fields as download_paper (pdf_url, title, year, subject, topic). "
+        "Downloads run concurrently and all chunks are embedded in one batch; prefer this over "
+        "repeated download_paper calls when the user picks more than one paper."
+    ),
+)
+async def mcp_download_papers(
+    papers: List[Dict[str, Any]],
+    add_to_vectordb: bool = True,
+) -> Dict[str, Any]:
+    """
+    Download multiple papers concurrently and index them together.
+    """
+    try:
+        items = [DownloadPdfArgs(**paper).model_dump(exclude={"add_to_vectordb"}) for paper in papers]
+    except (ValidationError, TypeError) as e:
+        details = e.errors() if isinstance(e, ValidationError) else str(e)
+        return {"error": "validation_error", "details": details}
+
+    # Runs its own thread pool; keep the event loop free while it works
+    return await asyncio.to_thread(download_papers, items, add_to_vectordb=add_to_vectordb)
 
 
-# ============== Tool 4: Generate PDF Report ==============
+# ============== Tool 5: Generate PDF Report ==============
 
 
 # Output directory for generated reports ( Hard coded)
 # REPORTS_PATH = Path(__file__).resolve().parent.parent / "Reports"
 REPORTS_PATH = Path(os.getenv("REPORTS_DIR", Path(__file__).resolve().parent.parent / "Reports"))
 
+class _ReportNameTable(dict):
+    """str.translate table keeping alphanumerics and ' -_', mapping anything else to '_'; filled lazily per character."""
+
+    def __missing__(self, codepoint: int) -> str:
+        char = chr(codepoint)
+        self[codepoint] = char if char.isalnum() or char in " -_" else "_"
+        return self[codepoint]
+
+
+_REPORT_NAME_CHARS = _ReportNameTable()
+
+
 class GenerateReportArgs(BaseModel):
     """Arguments for generating a PDF report."""
     title: str = Field(..., description="Title of the report")
@@ -217,7 +318,23 @@ class GenerateReportArgs(BaseModel):
     include_toc: bool = Field(default=True, description="Include table of contents")
 
 
-@mcp.tool(
+def _render_pdf(args: GenerateReportArgs, output_path: Path) -> None:
+    """Render the report markdown to a PDF file (blocking)."""
+    pdf = MarkdownPdf()
+    pdf.meta["title"] = args.title
+    pdf.meta["author"] = args.author or "Research Assistant"
+    
+    # Add title header to content
+    full_content = f"# {args.title}\n\n{args.content}"
+    
+    # Add section with optional TOC
+    pdf.add_section(Section(full_content, toc=args.include_toc))
+    
+    # Save PDF
+    pdf.save(str(output_path))
+
+
+@json_tool(
     name="generate_report",
     description=(
         "Generate a PDF report from markdown content. "
@@ -226,7 +343,7 @@ class GenerateReportArgs(BaseModel):
         "Reports are saved to the Reports/ folder."
     ),
 )
-def mcp_generate_report(
+async def mcp_generate_report(
     title: str,
     content: str,
     author: Optional[str] = "Research Assistant",
@@ -253,28 +370,17 @@ def mcp_generate_report(
         
         # Generate filename if not provided
         if args.filename:
-            safe_filename = "".join(c if c.isalnum() or c in " -_" else "_" for c in args.filename)
+            safe_filename = args.filename.translate(_REPORT_NAME_CHARS)
         else:
             # Use title + timestamp
-            safe_title = "".join(c if c.isalnum() or c in " -_" else "_" for c in args.title)
+            safe_title = args.title.translate(_REPORT_NAME_CHARS)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             safe_filename = f"{safe_title}_{timestamp}"
         
         output_path = REPORTS_PATH / f"{safe_filename}.pdf"
         
-        # Create PDF
-        pdf = MarkdownPdf()
-        pdf.meta["title"] = args.title
-        pdf.meta["author"] = args.author or "Research Assistant"
-        
-        # Add title header to content
-        full_content = f"# {args.title}\n\n{args.content}"
-        
-        # Add section with optional TOC
-        pdf.add_section(Section(full_content, toc=args.include_toc))
-        
-        # Save PDF
-        pdf.save(str(output_path))
+        # Render off the event loop so other tool calls are served meanwhile
+        await asyncio.to_thread(_render_pdf, args, output_path)
         
         return {
             "success": True,
@@ -302,7 +408,8 @@ if __name__ == "__main__":
     print("  1. research_paper_probe - Query the RAG knowledge base")
     print("  2. search_arxiv - Search arXiv for papers")
     print("  3. download_paper - Download and index papers")
-    print("  4. generate_report - Generate PDF reports from markdown")
+    print("  4. download_papers - Download and index several papers at once")
+    print("  5. generate_report - Generate PDF reports from markdown")
     print()
     
     # Initialize RAG system BEFORE starting the server
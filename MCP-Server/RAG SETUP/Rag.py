@@ -1,21 +1,84 @@
 import os
+import sys
 import re
+import json
+import time
+import uuid
+import errno
+import hashlib
+import asyncio
 import shutil
+import string
+import sqlite3
 import threading
+import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from collections import OrderedDict, deque
+from contextlib import closing
 from pathlib import Path
 from typing import Any, List, Optional, Sequence, Type, Union, Annotated
 from langchain.chains import ConversationalRetrievalChain
 from langchain.chains.conversational_retrieval.base import BaseConversationalRetrievalChain
 from langchain.chains.query_constructor.base import AttributeInfo
-from pydantic import BaseModel, Field 
-from langchain_community.document_loaders import DirectoryLoader, PyMuPDFLoader
+from pydantic import BaseModel, Field, PrivateAttr
+from langchain_core.documents import Document
 from langchain_community.vectorstores import Chroma
+import chromadb
 from langchain_core.language_models import BaseLanguageModel
 from langchain_core.vectorstores import VectorStore
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_openai import ChatOpenAI
 from langchain.retrievers.self_query.base import SelfQueryRetriever
 from langchain.tools import BaseTool
+import fitz
+import tiktoken
+from cached_embeddings import CachedEmbeddings, default_embeddings
+from chunking import split_documents, expand_documents
+
+
+_PUNCTUATION = str.maketrans("", "", string.punctuation)
+
+
+def _normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace, so trivially different phrasings share a key."""
+    return " ".join(query.lower().translate(_PUNCTUATION).split())
+
+
+class CachedSelfQueryRetriever(SelfQueryRetriever):
+    """
+    SelfQueryRetriever that caches the LLM-built StructuredQuery per normalized query,
+    so repeated questions skip the query-constructor LLM call and go straight to the vector store.
+    """
+    cache_size: int = 256
+    _structured_queries: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _cache_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def forget(self, query: str) -> None:
+        """Drop the cached StructuredQuery for query, forcing a fresh LLM translation next time."""
+        with self._cache_lock:
+            self._structured_queries.pop(_normalize_query(query), None)
+
+    def _get_relevant_documents(self, query: str, *, run_manager) -> List[Any]:
+        key = _normalize_query(query)
+        with self._cache_lock:
+            structured_query = self._structured_queries.get(key)
+            if structured_query is not None:
+                self._structured_queries.move_to_end(key)
+        
+        if structured_query is None:
+            structured_query = self.query_constructor.invoke(
+                {"query": query},
+                config={"callbacks": run_manager.get_child()},
+            )
+            with self._cache_lock:
+                self._structured_queries[key] = structured_query
+                while len(self._structured_queries) > self.cache_size:
+                    self._structured_queries.popitem(last=False)
+        
+        new_query, search_kwargs = self._prepare_query(query, structured_query)
+        # Chunks are stored without overlap; restore surrounding context for the answer chain
+        return expand_documents(self._get_docs_with_query(new_query, search_kwargs))
 
 
 def educated_retriever(
@@ -29,7 +92,7 @@ def educated_retriever(
     Builds a conversational retrieval QA pipeline by combining a SelfQueryRetriever
     with a ConversationalRetrievalChain.
     """
-    retriever = SelfQueryRetriever.from_llm(
+    retriever = CachedSelfQueryRetriever.from_llm(
         llm,
         vectordb,
         document_contents=document_content,
@@ -45,6 +108,379 @@ def educated_retriever(
     return qa
 
 
+# Four-digit year in the "{title} - {year}" part of a paper filename
+_YEAR_RE = re.compile(r"(\d{4})")
+
+# OpenAI rejects embedding requests above 300k tokens; leave headroom for tokenizer drift
+MAX_EMBED_BATCH_TOKENS = 250_000
+
+
+# Retrieved-context budget for answer generation (gpt-4o-mini tokens)
+ANSWER_CONTEXT_TOKENS = 60_000
+
+
+@lru_cache(maxsize=None)
+def _token_encoder(encoding: str = "cl100k_base"):
+    """tiktoken encoder, or None when its BPE file can't be loaded (e.g. offline)."""
+    try:
+        return tiktoken.get_encoding(encoding)
+    except Exception:
+        return None
+
+
+def _count_tokens(texts: List[str], encoding: str = "cl100k_base") -> List[int]:
+    """Token count per text; falls back to a ~4 chars/token estimate without an encoder."""
+    encoder = _token_encoder(encoding)
+    if encoder is None:
+        return [len(t) // 4 + 1 for t in texts]
+    return [len(ids) for ids in encoder.encode_batch(texts, disallowed_special=())]
+
+
+def _token_batches(token_counts: List[int], max_items: int, max_tokens: int = MAX_EMBED_BATCH_TOKENS) -> List[tuple]:
+    """
+    (start, end) slices of consecutive items holding at most max_items items and max_tokens tokens
+    (a single item over the token budget still gets a slice of its own).
+    """
+    slices, start, tokens = [], 0, 0
+    for i, count in enumerate(token_counts):
+        if i > start and (i - start >= max_items or tokens + count > max_tokens):
+            slices.append((start, i))
+            start, tokens = i, 0
+        tokens += count
+    if start < len(token_counts):
+        slices.append((start, len(token_counts)))
+    return slices
+
+
+# Embedding requests in flight at once while indexing; stays under OpenAI's concurrency ceiling
+EMBED_CONCURRENCY = 16
+
+
+def _run_async(coro):
+    """Run a coroutine to completion, on a helper thread when this one already has a running loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        return ex.submit(asyncio.run, coro).result()
+
+
+def _discard_dir(path: Path):
+    """Move a directory aside to a .trash-<uuid> sibling and delete it on a background thread."""
+    trash = path.with_name(f".trash-{uuid.uuid4().hex}")
+    try:
+        path.rename(trash)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.rmtree(path)
+        return
+    threading.Thread(target=shutil.rmtree, args=(trash,), kwargs={"ignore_errors": True}, daemon=True).start()
+
+
+# HNSW params for new collections, tuned for bulk-insert throughput: a sparser graph
+# (M=12, construction_ef=64), a large brute-force buffer before graph inserts and
+# infrequent index flushes. Existing collections keep the params they were created with.
+HNSW_COLLECTION_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:construction_ef": 64,
+    "hnsw:M": 12,
+    "hnsw:batch_size": 10000,
+    "hnsw:sync_threshold": 100000,
+}
+
+# Parsed PDFs allowed ahead of the consumer, per worker process
+PARSE_AHEAD = 2
+# Embedding groups (each up to EMBED_CONCURRENCY batches) queued between parsing and embedding
+PIPELINE_DEPTH = 2
+
+# Worker processes for PDF parsing, shared by every caller in this process. They are spawned,
+# not forked: forking once the embedder, server and HTTP client threads run could copy locks
+# those threads hold (sqlite, tokenizers, logging) into the child and deadlock it.
+PDF_POOL_WORKERS = os.cpu_count() or 1
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """The shared PDF worker pool, started on first use; workers are reused across calls."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=PDF_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pdf_pool
+
+# Filtered searches restrict the query to a cached id-set of matching chunks (cheaper than
+# Chroma re-evaluating the where-filter each time); larger sets fall back to the where-filter
+FILTER_IDS_CACHE_SIZE = 64
+FILTER_IDS_MAX = 50_000
+
+# Answers kept by RAGSearchTool._run for repeated searches
+RUN_CACHE_SIZE = 512
+
+# Papers that failed to embed are retried in the background after this delay (seconds),
+# doubling per failed attempt up to INDEX_RETRY_MAX_DELAY
+INDEX_RETRY_DELAY = 60
+INDEX_RETRY_MAX_DELAY = 3600
+
+# Keep IN (...) lookups below sqlite's bound-parameter limit
+SQL_IN_BATCH = 500
+
+# Manifest of indexed papers ({file_path: mtime_ns}) kept next to the Chroma store
+INDEX_MANIFEST_FILE = "indexed.json"
+
+# Sidecar listing of the Papers tree, reused while no directory in it has changed
+PDF_INDEX_FILE = ".pdf_index.json"
+
+
+# Serializes manifest read-modify-writes between startup indexing and downloads
+_manifest_lock = threading.Lock()
+
+
+def _load_manifest(manifest_path: Path) -> Optional[dict]:
+    """Read a {file_path: mtime_ns} manifest of indexed papers; None if missing or unreadable."""
+    try:
+        return json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _save_manifest(manifest_path: Path, manifest: dict):
+    """Write the manifest atomically (temp file + rename), so a crash never leaves it half-written."""
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    try:
+        tmp_path.write_text(json.dumps(manifest), encoding="utf-8")
+        os.replace(tmp_path, manifest_path)
+    except OSError as e:
+        print(f"Warning: Could not write {INDEX_MANIFEST_FILE}: {e}")
+
+
+def _mtimes(paths) -> dict:
+    """{path: mtime_ns} for paths that still exist."""
+    mtimes = {}
+    for p in paths:
+        try:
+            mtimes[str(p)] = os.stat(p).st_mtime_ns
+        except OSError:
+            pass
+    return mtimes
+
+
+def _record_indexed(persist_directory: Path, paths):
+    """
+    Add papers indexed outside RAGSearchTool (e.g. downloads) to the store's manifest.
+    Without a manifest there is nothing to update: the next startup rebuilds it from Chroma.
+    """
+    manifest_path = Path(persist_directory) / INDEX_MANIFEST_FILE
+    with _manifest_lock:
+        manifest = _load_manifest(manifest_path)
+        if manifest is not None:
+            manifest.update(_mtimes(paths))
+            _save_manifest(manifest_path, manifest)
+
+
+def _file_digest(file_path) -> str:
+    """Content hash of a file, stored with its chunks to detect changed PDFs."""
+    with open(file_path, "rb") as f:
+        return hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+
+
+def _scan_pdf_tree(root: str) -> tuple:
+    """Recursively list PDFs under root with os.scandir; also return each directory's mtime."""
+    pdfs, dir_mtimes = [], {}
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            dir_mtimes[current] = os.stat(current).st_mtime_ns
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        stack.append(entry.path)
+                    elif entry.name.endswith(".pdf") and entry.is_file():
+                        pdfs.append(entry.path)
+        except OSError:
+            continue
+    return pdfs, dir_mtimes
+
+
+@lru_cache(maxsize=4096)
+def _paper_metadata(file_path: Path, base_path: Path) -> dict:
+    """
+    Extract metadata from research paper filename and path.
+    Expected filename format: {paper_title} - {year} - {description}.pdf
+    Expected path structure: Papers/Subject/Topic/filename.pdf
+    """
+    metadata = {
+        "subject": "Artificial Intelligence",  # Default for now
+        "topic": None,
+        "paper_title": None,
+        "year": None,
+        "file_name": file_path.name,
+        "file_path": str(file_path),
+    }
+    
+    # Extract subject and topic from directory structure
+    try:
+        rel_path = file_path.relative_to(base_path)
+        parts = rel_path.parts
+        # Expected: Subject/Topic/filename.pdf
+        if len(parts) >= 2:
+            metadata["subject"] = sys.intern(parts[0])  # e.g., "Artificial Intelligence"
+        if len(parts) >= 3:
+            metadata["topic"] = sys.intern(parts[1])  # e.g., "Agentic AI", "Finetuning"
+    except ValueError:
+        pass
+    
+    # Parse filename: {title} - {year} - {description}.pdf
+    filename_stem = file_path.stem  # Remove .pdf extension
+    
+    # Split by " - " to get parts
+    parts = [p.strip() for p in filename_stem.split(" - ")]
+    
+    if len(parts) >= 1:
+        metadata["paper_title"] = parts[0]
+    
+    if len(parts) >= 2:
+        # Try to extract year from second part
+        year_match = _YEAR_RE.search(parts[1])
+        if year_match:
+            metadata["year"] = int(year_match.group(1))
+        else:
+            # If no year in second part, it might be part of title or description
+            metadata["paper_title"] = f"{parts[0]} - {parts[1]}"
+    
+    return metadata
+
+
+def _extract_paper_metadata(file_path: Path, base_path: Path) -> dict:
+    """Paper metadata for file_path, memoized per (file, root); returns a copy callers may modify."""
+    return dict(_paper_metadata(Path(file_path), Path(base_path)))
+
+
+def _relpath(file_path, root) -> str:
+    """Path of file_path relative to root (string prefix check), or its file name when outside root."""
+    root, path = str(root).rstrip(os.sep), str(file_path)
+    if path.startswith(root + os.sep):
+        return path[len(root) + 1:]
+    return os.path.basename(path)
+
+
+_SOURCE_KEYS = ("paper_title", "year", "topic", "subject", "page")
+
+
+def _source_fields(doc) -> tuple:
+    """(paper_title, year, topic, subject, page) of a retrieved chunk, with a 1-based page (or None)."""
+    md = doc.metadata or {}
+    title, year, topic, subject, page = [md.get(key) for key in _SOURCE_KEYS]
+    return title, year, topic, subject, page + 1 if page is not None else None
+
+
+def _extract_page_range(path: str, start: int, end: int) -> List[tuple]:
+    """Worker: open a private fitz document and return (page, text) for pages [start, end)."""
+    with fitz.open(path) as doc:
+        return [(i, doc[i].get_text().strip()) for i in range(start, end)]
+
+
+def _load_pdf(pdf_path: str) -> List[Document]:
+    """
+    Load a PDF into one Document per page straight from fitz, skipping PyMuPDFLoader's
+    per-page parser machinery; page metadata mirrors what the loader attaches.
+    """
+    with fitz.open(pdf_path) as doc:
+        pdf_metadata = {k: v for k, v in doc.metadata.items() if isinstance(v, (str, int))}
+        base_metadata = {
+            "producer": "PyMuPDF",
+            "creator": "PyMuPDF",
+            **pdf_metadata,
+            "creationdate": pdf_metadata.get("creationDate", ""),
+            "moddate": pdf_metadata.get("modDate", ""),
+            "source": pdf_path,
+            "file_path": pdf_path,
+            "total_pages": doc.page_count,
+        }
+        return [
+            Document(page_content=page.get_text().strip(), metadata={**base_metadata, "page": i})
+            for i, page in enumerate(doc)
+        ]
+
+
+def _parse_and_split(pdf_path: str, root: Path) -> tuple:
+    """
+    Worker: load one PDF, attach paper metadata and split it into chunks.
+    Returns (pdf_path, chunks, error) so one bad file doesn't abort a whole pool run.
+    """
+    try:
+        pdf_file = Path(pdf_path)
+        raw_docs = _load_pdf(str(pdf_file))
+        
+        # Extract and add metadata (computed once per file)
+        paper_metadata = {
+            **_extract_paper_metadata(pdf_file, root),
+            "doc_id": pdf_file.stem,
+            "relpath": _relpath(pdf_path, root),
+            # Same change marker corpus_expansion records, so either side can detect a replaced PDF
+            "content_hash": _file_digest(pdf_path)
+        }
+        for d in raw_docs:
+            d.metadata.update(paper_metadata)
+        
+        chunks = split_documents(raw_docs)
+        # Deterministic ids (same scheme as corpus_expansion), so re-indexing overwrites
+        for i, chunk in enumerate(chunks):
+            chunk.id = f"{pdf_file.stem}_{i}"
+        return pdf_path, chunks, None
+    except Exception as e:
+        return pdf_path, [], e
+
+
+def _parse_pdfs(pdf_paths: list, root: Path):
+    """
+    Yield _parse_and_split results in order, fanning out across processes when there is more than one PDF.
+    At most PARSE_AHEAD PDFs per worker are in flight, so parsed chunks never pile up ahead of embedding.
+    """
+    if len(pdf_paths) <= 1:
+        yield from (_parse_and_split(p, root) for p in pdf_paths)
+        return
+    workers = min(PDF_POOL_WORKERS, len(pdf_paths))
+    pool = _get_pdf_pool()
+    in_flight = deque()
+    try:
+        for pdf_path in pdf_paths:
+            in_flight.append(pool.submit(_parse_and_split, pdf_path, root))
+            if len(in_flight) >= workers * PARSE_AHEAD:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+    finally:
+        # The pool outlives this call: drop queued work if the consumer stopped early
+        for future in in_flight:
+            future.cancel()
+
+
+@lru_cache(maxsize=256)
+def _metadata_filter(subject: Optional[str], topic: Optional[str], year: Optional[int]) -> Optional[dict]:
+    """Chroma where-filter for (subject, topic, year), shared per combination; treat as read-only."""
+    conditions = []
+    
+    if subject:
+        conditions.append({"subject": {"$eq": subject}})
+    if topic:
+        conditions.append({"topic": {"$eq": topic}})
+    if year is not None:
+        conditions.append({"year": {"$eq": year}})
+    
+    if not conditions:
+        return None
+    elif len(conditions) == 1:
+        return conditions[0]
+    else:
+        return {"$and": conditions}
+
+
 class RAGSearchInput(BaseModel):
     """Input schema for the RAG search tool"""
     query: str = Field(..., description="The query to search for in the research papers")
@@ -53,6 +489,8 @@ class RAGSearchInput(BaseModel):
     topic: Optional[str] = Field(default=None, description="Topic within the subject (e.g., 'Agentic AI', 'Finetuning')")
     year: Optional[int] = Field(default=None, description="Publication year of the paper")
     chain_type: Optional[str] = Field(default="stuff", description="Chain type for the QA system")
+    bypass_cache: bool = Field(default=False, description="Re-run the LLM metadata-filter translation instead of reusing a cached one")
+    use_self_query: bool = Field(default=False, description="Without explicit filters, let the LLM infer metadata filters from the query (one extra LLM call)")
     
     
 class RAGSearchTool(BaseTool):
@@ -72,6 +510,15 @@ class RAGSearchTool(BaseTool):
     _embeddings: Any = None
     _init_lock: Any = None
     _llm: Any = None
+    _vectordb_ready: bool = False
+    _manifest_path: Any = None
+    _cache_version: int = 0
+    _run_cache: Any = None
+    _run_cache_lock: Any = None
+    _filter_ids_cache: Any = None
+    _failed_paths: Any = None
+    _retry_at: Optional[float] = None
+    _retry_delay: float = 0.0
 
     def __init__(
         self,
@@ -89,61 +536,33 @@ class RAGSearchTool(BaseTool):
             collection_name=collection_name
         )
 
-        self._embeddings = OpenAIEmbeddings()
+        self._embeddings = CachedEmbeddings(default_embeddings())
         self._init_lock = threading.Lock()
+        self._manifest_path = self.persist_directory / INDEX_MANIFEST_FILE
+        self._run_cache = OrderedDict()
+        self._run_cache_lock = threading.Lock()
+        self._filter_ids_cache = OrderedDict()
+        self._failed_paths = set()
 
     def _extract_paper_metadata(self, file_path: Path, base_path: Path) -> dict:
+        """Extract metadata from research paper filename and path."""
+        return _extract_paper_metadata(file_path, base_path)
+
+    def _get_indexed_papers(self, candidates: Optional[set] = None) -> set:
         """
-        Extract metadata from research paper filename and path.
-        Expected filename format: {paper_title} - {year} - {description}.pdf
-        Expected path structure: Papers/Subject/Topic/filename.pdf
+        Get the set of paper file paths already indexed in the VectorDB.
+        With candidates, only those paths are checked, via an IN (...) query against
+        Chroma's sqlite store instead of loading every chunk's metadata.
         """
-        metadata = {
-            "subject": "Artificial Intelligence",  # Default for now
-            "topic": None,
-            "paper_title": None,
-            "year": None,
-            "file_name": file_path.name,
-            "file_path": str(file_path),
-        }
-        
-        # Extract subject and topic from directory structure
-        try:
-            rel_path = file_path.relative_to(base_path)
-            parts = rel_path.parts
-            # Expected: Subject/Topic/filename.pdf
-            if len(parts) >= 2:
-                metadata["subject"] = parts[0]  # e.g., "Artificial Intelligence"
-            if len(parts) >= 3:
-                metadata["topic"] = parts[1]  # e.g., "Agentic AI", "Finetuning"
-        except ValueError:
-            pass
-        
-        # Parse filename: {title} - {year} - {description}.pdf
-        filename_stem = file_path.stem  # Remove .pdf extension
-        
-        # Split by " - " to get parts
-        parts = [p.strip() for p in filename_stem.split(" - ")]
-        
-        if len(parts) >= 1:
-            metadata["paper_title"] = parts[0]
-        
-        if len(parts) >= 2:
-            # Try to extract year from second part
-            year_match = re.search(r"(\d{4})", parts[1])
-            if year_match:
-                metadata["year"] = int(year_match.group(1))
-            else:
-                # If no year in second part, it might be part of title or description
-                metadata["paper_title"] = f"{parts[0]} - {parts[1]}"
-        
-        return metadata
-
-    def _get_indexed_papers(self) -> set:
-        """Get the set of paper file paths already indexed in the VectorDB."""
         if self._vectordb is None:
             return set()
         
+        if candidates is not None:
+            try:
+                return self._indexed_among(candidates)
+            except sqlite3.Error as e:
+                print(f"Warning: SQL index check failed ({e}); scanning collection metadata")
+        
         try:
             # Get all documents from the collection
             collection = self._vectordb._collection
@@ -160,153 +579,330 @@ class RAGSearchTool(BaseTool):
             print(f"Warning: Could not get indexed papers: {e}")
             return set()
 
+    def _indexed_among(self, candidates: set) -> set:
+        """Subset of candidate file paths with at least one chunk in this collection (read-only SQL)."""
+        db_uri = (self.persist_directory / "chroma.sqlite3").as_uri() + "?mode=ro"
+        candidates = list(candidates)
+        indexed = set()
+        with closing(sqlite3.connect(db_uri, uri=True)) as conn:
+            for i in range(0, len(candidates), SQL_IN_BATCH):
+                batch = candidates[i:i + SQL_IN_BATCH]
+                rows = conn.execute(
+                    f"""
+                    SELECT DISTINCT m.string_value
+                    FROM embedding_metadata m
+                    JOIN embeddings e ON e.id = m.id
+                    JOIN segments s ON s.id = e.segment_id
+                    JOIN collections c ON c.id = s.collection
+                    WHERE m.key = 'file_path' AND c.name = ?
+                      AND m.string_value IN ({",".join("?" * len(batch))})
+                    """,
+                    (self.collection_name, *batch)
+                )
+                indexed.update(value for (value,) in rows)
+        return indexed
+
+    def _load_manifest(self) -> Optional[dict]:
+        """Read this store's manifest of indexed papers; None if missing or unreadable."""
+        return _load_manifest(self._manifest_path)
+
+    def _save_manifest(self, manifest: dict):
+        """Write this store's manifest of indexed papers."""
+        with _manifest_lock:
+            _save_manifest(self._manifest_path, manifest)
+
     def _get_all_pdfs_in_papers_dir(self) -> set:
-        """Get the set of all PDF file paths in the Papers directory."""
-        pdf_paths = set()
-        for pdf_file in self.default_papers_path.rglob("*.pdf"):
-            pdf_paths.add(str(pdf_file.resolve()))
-        return pdf_paths
-
-    def _index_missing_papers(self, missing_paths: set):
-        """Index papers that are in the Papers directory but not in VectorDB."""
+        """
+        Get the set of all PDF file paths in the Papers directory.
+        Adding or removing an entry changes its directory's mtime, so while every recorded
+        directory mtime still matches, the cached listing in PDF_INDEX_FILE is current.
+        """
+        root = self.default_papers_path.resolve()
+        if not root.is_dir():
+            return set()
+        index_file = root / PDF_INDEX_FILE
+        
+        try:
+            index = json.loads(index_file.read_text(encoding="utf-8"))
+            # A sidecar copied along with the tree still describes its old location
+            if str(root) in index["dirs"] and all(
+                os.stat(d).st_mtime_ns == mtime for d, mtime in index["dirs"].items()
+            ):
+                return set(index["pdfs"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        
+        try:
+            # Create the index file before scanning so its own creation doesn't alter the recorded root mtime
+            index_file.touch(exist_ok=True)
+        except OSError:
+            pass
+        pdfs, dir_mtimes = _scan_pdf_tree(str(root))
+        try:
+            # Rewrite in place (no new directory entry, so no mtime change)
+            with open(index_file, "w", encoding="utf-8") as f:
+                json.dump({"dirs": dir_mtimes, "pdfs": pdfs}, f)
+        except OSError as e:
+            print(f"Warning: Could not write {PDF_INDEX_FILE}: {e}")
+        return set(pdfs)
+
+    def _index_missing_papers(self, missing_paths: set) -> tuple:
+        """
+        Index papers that are in the Papers directory but not in VectorDB.
+        Returns (paths indexed, paths whose embedding failed).
+        """
         if not missing_paths:
-            return
+            return set(), set()
         
         print(f"📄 Found {len(missing_paths)} new paper(s) to index...")
         
-        # Batch size for embedding to avoid OpenAI token limits
+        # Max chunks per embedding request; _index_pdfs also caps each request by token count
         BATCH_SIZE = 400
         
-        for pdf_path in missing_paths:
-            try:
-                pdf_file = Path(pdf_path)
-                print(f"  → Indexing: {pdf_file.name}")
-                
-                # Load the PDF
-                loader = PyMuPDFLoader(str(pdf_file))
-                raw_docs = loader.load()
-                
-                # Extract and add metadata
-                paper_metadata = self._extract_paper_metadata(pdf_file, self.default_papers_path)
-                for d in raw_docs:
-                    d.metadata.update(paper_metadata)
-                    d.metadata.update({
-                        "doc_id": pdf_file.stem,
-                        "relpath": str(pdf_file.relative_to(self.default_papers_path)) 
-                            if self.default_papers_path in pdf_file.parents or pdf_file.parent == self.default_papers_path 
-                            else pdf_file.name
-                    })
-                
-                # Split into chunks
-                splitter = RecursiveCharacterTextSplitter(chunk_size=1500, chunk_overlap=250)
-                split_docs = splitter.split_documents(raw_docs)
-                
-                # Add to vectordb in batches to avoid token limits
-                total_chunks = len(split_docs)
-                if total_chunks > BATCH_SIZE:
-                    print(f"    Large paper: {total_chunks} chunks, indexing in batches...")
-                    for i in range(0, total_chunks, BATCH_SIZE):
-                        batch = split_docs[i:i + BATCH_SIZE]
-                        self._vectordb.add_documents(batch)
-                    print(f"    ✓ Added {total_chunks} chunks in {(total_chunks + BATCH_SIZE - 1) // BATCH_SIZE} batches")
-                else:
-                    self._vectordb.add_documents(split_docs)
-                    print(f"    ✓ Added {total_chunks} chunks")
-                
-            except Exception as e:
-                print(f"    ✗ Failed to index {pdf_path}: {e}")
+        # Parse + split run in worker processes; Chroma writes stay on this process
+        _, indexed_paths, failed_paths = self._index_pdfs(sorted(missing_paths), BATCH_SIZE)
         
         print(f"✓ Finished indexing new papers")
+        if failed_paths:
+            print(f"⚠ {len(failed_paths)} paper(s) failed to embed; they will be retried in the background")
+        return indexed_paths, failed_paths
 
-    def _check_and_index_missing_papers(self):
-        """Check for papers in Papers directory that are not indexed and index them."""
-        if self._vectordb is None:
-            return
-            
-        indexed_papers = self._get_indexed_papers()
-        all_pdfs = self._get_all_pdfs_in_papers_dir()
-        missing_papers = all_pdfs - indexed_papers
+    async def _embed_batches(self, batches: list) -> list:
+        """Embed batches concurrently, at most EMBED_CONCURRENCY requests in flight."""
+        sem = asyncio.Semaphore(EMBED_CONCURRENCY)
         
-        if missing_papers:
-            self._index_missing_papers(missing_papers)
-        else:
-            print("✓ All papers in Papers directory are already indexed")
+        async def one(batch):
+            async with sem:
+                return await self._embeddings.aembed_documents([d.page_content for d in batch])
+        
+        return await asyncio.gather(*(one(b) for b in batches))
 
-    def _load_or_build_vectordb(self):
-        db_file = self.persist_directory / "chroma.sqlite3"
-        if db_file.exists() and self._vectordb is None:
-            self._vectordb = Chroma(
-                persist_directory=str(self.persist_directory),
-                collection_name=self.collection_name,
-                embedding_function=self._embeddings,
+    def _add_batches(self, batches: list):
+        """Embed batches concurrently, then write each with a native Chroma upsert (single writer)."""
+        for batch, vectors in zip(batches, _run_async(self._embed_batches(batches))):
+            self._vectordb._collection.upsert(
+                ids=[d.id for d in batch],
+                embeddings=vectors,
+                documents=[d.page_content for d in batch],
+                metadatas=[d.metadata for d in batch],
             )
-            # Check for new papers that need to be indexed
-            self._check_and_index_missing_papers()
-            return
+        # New chunks can change any answer; cache keys carry this version
+        self._cache_version += 1
 
-        if self._vectordb is not None:
-            return
+    def _index_pdfs(self, pdf_paths: list, batch_size: int) -> tuple:
+        """
+        Parse PDFs in worker processes and add their chunks to the vectordb.
+        Returns (chunk count, set of paths indexed without errors, set of paths whose embedding failed).
+        Chunks from all papers share one queue, cut into batches of at most batch_size chunks
+        and MAX_EMBED_BATCH_TOKENS tokens; up to EMBED_CONCURRENCY batches are embedded at once.
+        Embedding + writes run on a separate thread fed through a bounded queue, so parsing
+        keeps going while embedding requests are in flight.
+        """
+        pending, pending_tokens, ready, total = [], [], [], 0
+        indexed_paths = set()
+        groups = queue.Queue(maxsize=PIPELINE_DEPTH)
+        failed_paths = set()
+        
+        def embedder():
+            while (group := groups.get()) is not None:
+                try:
+                    print(f"    Embedding {len(group)} batch(es) concurrently...")
+                    self._add_batches(group)
+                except Exception as e:
+                    # Skip the papers in this group; their chunks from other groups are removed below
+                    papers = {d.metadata["file_path"] for batch in group for d in batch}
+                    print(f"    ✗ Failed to embed {len(papers)} paper(s): {e}")
+                    failed_paths.update(papers)
+        
+        embed_thread = threading.Thread(target=embedder, name="rag-embedder", daemon=True)
+        embed_thread.start()
+        
+        def flush(final=False):
+            nonlocal pending, pending_tokens
+            while pending:
+                # Longest prefix within both the chunk and token budgets (always at least one chunk)
+                n, tokens = 0, 0
+                while n < min(len(pending), batch_size) and (n == 0 or tokens + pending_tokens[n] <= MAX_EMBED_BATCH_TOKENS):
+                    tokens += pending_tokens[n]
+                    n += 1
+                if n == len(pending) and not final and n < batch_size:
+                    break
+                print(f"    Queued {n} chunks (~{tokens} tokens) for embedding...")
+                ready.append(pending[:n])
+                pending, pending_tokens = pending[n:], pending_tokens[n:]
+            if ready and (final or len(ready) >= EMBED_CONCURRENCY):
+                groups.put(ready[:])
+                ready.clear()
+        
+        try:
+            for pdf_path, split_docs, error in _parse_pdfs(pdf_paths, self.default_papers_path):
+                if error is not None:
+                    print(f"    ✗ Failed to index {pdf_path}: {error}")
+                    continue
+                print(f"  → Parsed: {Path(pdf_path).name} ({len(split_docs)} chunks)")
+                indexed_paths.add(pdf_path)
+                pending.extend(split_docs)
+                pending_tokens.extend(_count_tokens([d.page_content for d in split_docs]))
+                total += len(split_docs)
+                flush()
+            flush(final=True)
+        finally:
+            groups.put(None)
+            embed_thread.join()
+        if failed_paths:
+            self._vectordb._collection.delete(where={"file_path": {"$in": sorted(failed_paths)}})
+            self._cache_version += 1
+            indexed_paths -= failed_paths
+        return total, indexed_paths, failed_paths
 
-        loader = DirectoryLoader(
-            str(self.default_papers_path),
-            glob="**/*.pdf",
-            loader_cls=PyMuPDFLoader,
-        )
-        raw_docs = loader.load()
+    def _check_and_index_missing_papers(self) -> bool:
+        """
+        Check for papers in Papers directory that are not indexed (or changed since) and index them.
+        The on-disk manifest stands in for a full Chroma scan; the scan only runs to rebuild it.
+        Returns the papers that failed to embed (they stay out of the manifest).
+        """
+        if self._vectordb is None:
+            return set()
+        
+        all_pdfs = self._get_all_pdfs_in_papers_dir()
+        manifest = self._load_manifest()
+        if manifest is None:
+            # First run with this store: trust what Chroma holds as current
+            manifest = _mtimes(self._get_indexed_papers(all_pdfs))
+        
+        current = _mtimes(all_pdfs)
+        missing_papers = all_pdfs - manifest.keys()
+        # Papers can reach Chroma without a manifest entry (e.g. a download that predates it):
+        # adopt those that already have chunks instead of parsing and embedding them again
+        adopted = self._get_indexed_papers(missing_papers) & missing_papers if missing_papers else set()
+        missing_papers -= adopted
+        changed_papers = {p for p in all_pdfs & manifest.keys() if current.get(p) != manifest[p]}
+        
+        if changed_papers:
+            print(f"📝 {len(changed_papers)} paper(s) changed since indexing; re-indexing...")
+            for p in changed_papers:
+                self._vectordb._collection.delete(where={"file_path": p})
+        
+        to_index = missing_papers | changed_papers
+        indexed_paths, failed_paths = self._index_missing_papers(to_index)
+        if not to_index:
+            print("✓ All papers in Papers directory are already indexed")
+        
+        # Drop papers that left the Papers directory; record the ones just indexed
+        new_manifest = {p: m for p, m in manifest.items() if p in current and p not in to_index}
+        new_manifest.update((p, current[p]) for p in indexed_paths | adopted if p in current)
+        if new_manifest != manifest or not self._manifest_path.exists():
+            self._save_manifest(new_manifest)
+        return failed_paths
 
-        for d in raw_docs:
-            p = Path(d.metadata["source"])
-            
-            # Extract research paper metadata
-            paper_metadata = self._extract_paper_metadata(p, self.default_papers_path)
-            d.metadata.update(paper_metadata)
-            
-            # Add additional useful metadata
-            d.metadata.update({
-                "doc_id": p.stem,
-                "relpath": str(p.relative_to(self.default_papers_path)) if self.default_papers_path in p.parents or p.parent == self.default_papers_path else p.name
-            })
+    def _open_vectordb(self) -> Chroma:
+        """Open the store on a PersistentClient; a newly created collection gets the write-tuned HNSW params."""
+        client = chromadb.PersistentClient(path=str(self.persist_directory))
+        return Chroma(
+            client=client,
+            collection_name=self.collection_name,
+            embedding_function=self._embeddings,
+            collection_metadata=HNSW_COLLECTION_METADATA,
+        )
 
-        splitter = RecursiveCharacterTextSplitter(chunk_size=1500, chunk_overlap=250)
-        split_docs = splitter.split_documents(raw_docs)
+    def _load_or_build_vectordb(self) -> set:
+        """Open (or build) the store and index pending papers; returns the papers that failed to embed."""
+        db_file = self.persist_directory / "chroma.sqlite3"
+        if db_file.exists():
+            if self._vectordb is None:
+                self._vectordb = self._open_vectordb()
+            # Check for new papers that need to be indexed
+            return self._check_and_index_missing_papers()
 
         self.persist_directory.mkdir(parents=True, exist_ok=True)
+        self._vectordb = self._open_vectordb()
         
-        # Batch documents to avoid OpenAI token limits (max 300k tokens per request)
-        # Estimate ~500 tokens per chunk on average, so batch ~400 docs at a time to be safe
+        # Batch documents to avoid OpenAI token limits (max 300k tokens per request);
+        # _index_pdfs right-sizes each batch by token count, 400 chunks is the upper bound
         BATCH_SIZE = 400
-        total_docs = len(split_docs)
-        
-        print(f"Indexing {total_docs} document chunks in batches of {BATCH_SIZE}...")
+        pdf_paths = sorted(self._get_all_pdfs_in_papers_dir())
         
-        for i in range(0, total_docs, BATCH_SIZE):
-            batch = split_docs[i:i + BATCH_SIZE]
-            batch_num = (i // BATCH_SIZE) + 1
-            total_batches = (total_docs + BATCH_SIZE - 1) // BATCH_SIZE
-            print(f"  → Batch {batch_num}/{total_batches}: Embedding {len(batch)} chunks...")
-            
-            if i == 0:
-                # First batch: create the vectordb
-                self._vectordb = Chroma.from_documents(
-                    documents=batch,
-                    embedding=self._embeddings,
-                    collection_name=self.collection_name,
-                    persist_directory=str(self.persist_directory),
-                )
-            else:
-                # Subsequent batches: add to existing vectordb
-                self._vectordb.add_documents(batch)
-        
-        print(f"✓ Successfully indexed {total_docs} chunks from {len(raw_docs)} pages")
+        print(f"Indexing {len(pdf_paths)} papers in batches of {BATCH_SIZE} chunks...")
+        total_docs, indexed_paths, failed_paths = self._index_pdfs(pdf_paths, BATCH_SIZE)
+        self._save_manifest(_mtimes(indexed_paths))
+        print(f"✓ Successfully indexed {len(indexed_paths)} of {len(pdf_paths)} papers ({total_docs} chunks parsed)")
+        if failed_paths:
+            print(f"⚠ {len(failed_paths)} paper(s) failed to embed; they will be retried in the background")
+        return failed_paths
 
     def _initialize_components(self):
-        """Initialize the RAG components if not already initialized."""
-        if self._qa_chain is not None:
+        """
+        Make the vector store ready for retrieval (loading or building it once).
+        The LLM and the self-query chain are created lazily, on first use.
+        """
+        self._ensure_vectordb()
+
+    def _ensure_vectordb(self):
+        """Load or build the vectordb (including any pending indexing) if not already done."""
+        if self._vectordb_ready:
+            self._maybe_retry_failed()
             return
         with self._init_lock:
-            if self._qa_chain is not None:
+            if not self._vectordb_ready:
+                try:
+                    failed_paths = self._load_or_build_vectordb()
+                except Exception:
+                    self._vectordb = None  # reopen and re-check the manifest on the next call
+                    raise
+                # The manifest is written by now; papers that failed to embed are retried on a backoff
+                self._schedule_retry(failed_paths)
+                self._vectordb_ready = True
+
+    def _schedule_retry(self, failed_paths: set):
+        """Remember papers that failed to embed and when to retry them (exponential backoff)."""
+        self._failed_paths = set(failed_paths)
+        if not failed_paths:
+            self._retry_at, self._retry_delay = None, 0.0
+            return
+        self._retry_delay = min(INDEX_RETRY_MAX_DELAY, self._retry_delay * 2 or INDEX_RETRY_DELAY)
+        self._retry_at = time.monotonic() + self._retry_delay
+
+    def _maybe_retry_failed(self):
+        """Start a background re-index of failed papers once their retry time has come."""
+        retry_at = self._retry_at
+        if retry_at is None or time.monotonic() < retry_at:
+            return
+        with self._run_cache_lock:
+            if self._retry_at != retry_at:
+                return  # another caller claimed this retry
+            self._retry_at = None
+        threading.Thread(target=self._retry_failed_papers, name="rag-index-retry", daemon=True).start()
+
+    def _retry_failed_papers(self):
+        """Re-run the incremental index check; failed papers are not in the manifest, so it picks them up."""
+        with self._init_lock:
+            if self._vectordb is None:
                 return
-            self._load_or_build_vectordb()
+            print(f"🔁 Retrying {len(self._failed_paths)} paper(s) that failed to embed...")
+            try:
+                failed_paths = self._check_and_index_missing_papers()
+            except Exception as e:
+                print(f"Warning: Index retry failed: {e}")
+                failed_paths = self._failed_paths
+            self._schedule_retry(failed_paths)
+
+    def _ensure_llm(self) -> ChatOpenAI:
+        """The answer LLM, created on first use."""
+        if self._llm is None:
+            with self._init_lock:
+                if self._llm is None:
+                    self._llm = ChatOpenAI(temperature=0, model="gpt-4o-mini")
+        return self._llm
+
+    def _ensure_qa_chain(self):
+        """The SelfQueryRetriever chain, built on first use (only use_self_query searches need it)."""
+        if self._qa_chain is not None:
+            return self._qa_chain
+        self._ensure_vectordb()
+        llm = self._ensure_llm()
+        with self._init_lock:
+            if self._qa_chain is not None:
+                return self._qa_chain
             metadata_field_info = [
                 AttributeInfo(
                     name="subject", 
@@ -334,42 +930,90 @@ class RAGSearchTool(BaseTool):
                     description="The filename of the PDF document"
                 ),
             ]
-            self._llm = ChatOpenAI(temperature=0, model="gpt-4o-mini")
             self._qa_chain = educated_retriever(
-                llm=self._llm,
+                llm=llm,
                 metadata_field_info=metadata_field_info,
                 document_content="Research papers on Artificial Intelligence topics including Agentic AI, Finetuning, and Hierarchical Reasoning Models",
                 vectordb=self._vectordb,
                 chain_type="stuff",
             )
+            return self._qa_chain
 
     def _build_metadata_filter(self, subject: Optional[str], topic: Optional[str], year: Optional[int]) -> Optional[dict]:
         """
         Build a Chroma-compatible metadata filter from the provided parameters.
         Uses $and to combine multiple conditions.
         """
-        conditions = []
+        # Hot path: most queries carry no filters at all
+        if not subject and not topic and year is None:
+            return None
+        return _metadata_filter(subject, topic, year)
+
+    def _filter_ids(self, subject: Optional[str], topic: Optional[str], year: Optional[int]) -> Optional[list]:
+        """
+        Ids of chunks matching the metadata filter, cached per store version and chunk count.
+        None when the set exceeds FILTER_IDS_MAX (searching by where-filter is cheaper then).
+        """
+        # The count (~1ms) catches writes made without a version bump, e.g. by another process
+        key = (self._cache_version, self._vectordb._collection.count(), subject, topic, year)
+        with self._run_cache_lock:
+            if key in self._filter_ids_cache:
+                self._filter_ids_cache.move_to_end(key)
+                return self._filter_ids_cache[key]
         
-        if subject:
-            conditions.append({"subject": {"$eq": subject}})
-        if topic:
-            conditions.append({"topic": {"$eq": topic}})
-        if year:
-            conditions.append({"year": {"$eq": year}})
+        ids = self._vectordb._collection.get(
+            where=self._build_metadata_filter(subject, topic, year), include=[]
+        )["ids"]
+        ids = ids if len(ids) <= FILTER_IDS_MAX else None
+        with self._run_cache_lock:
+            self._filter_ids_cache[key] = ids
+            while len(self._filter_ids_cache) > FILTER_IDS_CACHE_SIZE:
+                self._filter_ids_cache.popitem(last=False)
+        return ids
+
+    def _search_by_vector(
+        self,
+        embedding: List[float],
+        k: int,
+        subject: Optional[str] = None,
+        topic: Optional[str] = None,
+        year: Optional[int] = None,
+    ) -> List[Document]:
+        """Top-k chunks for a query vector, restricted to the subject/topic/year filter if any."""
+        metadata_filter = self._build_metadata_filter(subject, topic, year)
+        if metadata_filter is None:
+            return self._vectordb.similarity_search_by_vector(embedding, k=k)
         
-        if not conditions:
-            return None
-        elif len(conditions) == 1:
-            return conditions[0]
-        else:
-            return {"$and": conditions}
+        ids = self._filter_ids(subject, topic, year)
+        if ids is None:
+            return self._vectordb.similarity_search_by_vector(embedding, k=k, filter=metadata_filter)
+        if not ids:
+            return []
+        result = self._vectordb._collection.query(
+            query_embeddings=[embedding],
+            n_results=min(k, len(ids)),
+            ids=ids,
+            include=["documents", "metadatas"],
+        )
+        return [
+            Document(id=doc_id, page_content=text, metadata=md or {})
+            for doc_id, text, md in zip(result["ids"][0], result["documents"][0], result["metadatas"][0])
+        ]
 
     def _generate_answer_from_docs(self, query: str, docs: List) -> str:
         """Generate an answer from retrieved documents using the LLM."""
         if not docs:
             return "No documents found matching the specified filters."
         
-        context = "\n\n---\n\n".join([doc.page_content for doc in docs])
+        # Keep retrieved chunks, in rank order, until the context token budget is spent
+        texts = [doc.page_content for doc in expand_documents(docs)]
+        parts, used = [], 0
+        for text, n in zip(texts, _count_tokens(texts, "o200k_base")):
+            if parts and used + n > ANSWER_CONTEXT_TOKENS:
+                break
+            parts.append(text)
+            used += n
+        context = "\n\n---\n\n".join(parts)
         
         from langchain_core.prompts import ChatPromptTemplate
         
@@ -385,7 +1029,7 @@ Question: {question}
 Answer:"""
         )
         
-        chain = prompt | self._llm
+        chain = prompt | self._ensure_llm()
         response = chain.invoke({"context": context, "question": query})
         return response.content.strip()
 
@@ -393,21 +1037,19 @@ Answer:"""
         """Format source documents into a list of source strings."""
         sources = []
         for i, doc in enumerate(docs, 1):
-            md = doc.metadata or {}
+            title, year, topic, subject, page = _source_fields(doc)
             parts = [f"[{i}]"]
             
-            if md.get("paper_title"):
-                parts.append(f"'{md.get('paper_title')}'")
-            if md.get("year"):
-                parts.append(f"({md.get('year')})")
-            if md.get("topic"):
-                parts.append(f"[{md.get('topic')}]")
-            if md.get("subject"):
-                parts.append(f"- {md.get('subject')}")
-            
-            page = md.get("page")
+            if title:
+                parts.append(f"'{title}'")
+            if year:
+                parts.append(f"({year})")
+            if topic:
+                parts.append(f"[{topic}]")
+            if subject:
+                parts.append(f"- {subject}")
             if page is not None:
-                parts.append(f"p.{page + 1}")
+                parts.append(f"p.{page}")
             
             sources.append(" ".join(parts))
         return sources
@@ -420,6 +1062,8 @@ Answer:"""
         topic: Optional[str] = None,
         year: Optional[int] = None,
         k: int = 10,
+        bypass_cache: bool = False,
+        use_self_query: bool = False,
     ) -> str:
         """
         Executes the RAG search by applying explicit metadata filters
@@ -430,27 +1074,54 @@ Answer:"""
         if papers_path:
             new_path = Path(papers_path)
             if self.default_papers_path != new_path:
-                self.default_papers_path = new_path
-                self._qa_chain = None
-                self._vectordb = None
-                if self.persist_directory.exists():
-                    shutil.rmtree(self.persist_directory)
+                # Under the init lock, so a background index retry never writes into the old store
+                with self._init_lock:
+                    self.default_papers_path = new_path
+                    self._qa_chain = None
+                    self._vectordb = None
+                    self._vectordb_ready = False
+                    self._schedule_retry(set())
+                    if self.persist_directory.exists():
+                        _discard_dir(self.persist_directory)
 
         self._initialize_components()
 
+        # Identical recent searches against an unchanged store reuse the previous answer
+        key = (self._cache_version, _normalize_query(query), subject, topic, year, k, use_self_query)
+        if not bypass_cache:
+            with self._run_cache_lock:
+                cached = self._run_cache.get(key)
+                if cached is not None:
+                    self._run_cache.move_to_end(key)
+                    return cached
+        
+        result = self._search(query, subject, topic, year, k, bypass_cache, use_self_query)
+        if not result.startswith("Error:"):
+            with self._run_cache_lock:
+                self._run_cache[key] = result
+                while len(self._run_cache) > RUN_CACHE_SIZE:
+                    self._run_cache.popitem(last=False)
+        return result
+
+    def _search(
+        self,
+        query: str,
+        subject: Optional[str],
+        topic: Optional[str],
+        year: Optional[int],
+        k: int,
+        bypass_cache: bool,
+        use_self_query: bool,
+    ) -> str:
+        """Retrieve documents and answer the query (uncached part of _run)."""
         # Build explicit metadata filter for Chroma
         metadata_filter = self._build_metadata_filter(subject, topic, year)
 
         try:
-            # If explicit filters are provided, bypass SelfQueryRetriever
-            # and use direct vector store retrieval with guaranteed filters
-            if metadata_filter:
-                # Use direct similarity search with explicit filter
-                docs = self._vectordb.similarity_search(
-                    query,
-                    k=k,
-                    filter=metadata_filter
-                )
+            # Unless the caller opts into SelfQueryRetriever (an extra LLM call to infer filters),
+            # use direct vector store retrieval: explicit filters are guaranteed, none means unfiltered
+            if metadata_filter or not use_self_query:
+                docs = self._search_by_vector(self._embeddings.embed_query(query), k, subject, topic, year)
                 
                 answer = self._generate_answer_from_docs(query, docs)
                 sources = self._format_sources(docs)
@@ -458,20 +1129,22 @@ Answer:"""
                 return f"Answer: {answer}\n\nSources:\n" + ("\n".join(sources) if sources else "(none)")
             
             else:
-                # No explicit filters - use the SelfQueryRetriever for intelligent querying
-                retr = self._qa_chain.retriever
+                # No explicit filters and opted in - use the SelfQueryRetriever for intelligent querying
+                qa_chain = self._ensure_qa_chain()
+                retr = qa_chain.retriever
+                if bypass_cache:
+                    retr.forget(query)
                 orig_kwargs = retr.search_kwargs.copy()
                 try:
                     retr.search_kwargs["k"] = k
-                    response = self._qa_chain({"question": query, "chat_history": []})
+                    response = qa_chain({"question": query, "chat_history": []})
 
                     answer = (response.get("answer") or "").strip()
                     sources = self._format_sources(response.get("source_documents", []) or [])
 
                     return f"Answer: {answer}\n\nSources:\n" + ("\n".join(sources) if sources else "(none)")
                 finally:
-                    if self._qa_chain:
-                        self._qa_chain.retriever.search_kwargs = orig_kwargs
+                    retr.search_kwargs = orig_kwargs
                         
         except Exception as e:
             return f"Error: {e!r}"
\ No newline at end of file
@@ -1,9 +1,14 @@
-from typing import Literal, Dict, Any, List, Optional
+from typing import Literal, Dict, Any, List, Optional, Tuple
 from pydantic import BaseModel, Field
 from langchain.tools import StructuredTool
 from pathlib import Path
-from Rag import RAGSearchTool
+from collections import OrderedDict
+from Rag import RAGSearchTool, _source_fields
+import copy
+import itertools
 import os
+import threading
+import numpy as np
 
 # Hard coded Paths
 # Paths relative to this file's location (RAG SETUP directory)
@@ -48,15 +53,66 @@ class ResearchProbeArgs(BaseModel):
     subject: Optional[str] = Field(default=None, description="Subject filter (e.g., 'Artificial Intelligence')")
     year: Optional[int] = Field(default=None, description="Publication year filter", ge=1900, le=2100)
     k: int = Field(default=10, ge=1, le=50, description="Number of documents to retrieve")
+    bypass_cache: bool = Field(default=False, description="Ignore cached answers and run retrieval again")
 
 
+# ============== Semantic Cache ==============
+# Paraphrased questions with identical filters reuse a previous answer instead of re-running RAG
+
+SEMANTIC_CACHE_SIZE = 256
+SEMANTIC_CACHE_THRESHOLD = 0.95
+
+_semantic_cache: "OrderedDict[int, Tuple[tuple, np.ndarray, Dict[str, Any]]]" = OrderedDict()
+_semantic_cache_ids = itertools.count()
+_semantic_cache_lock = threading.Lock()
+
+
+def _semantic_lookup(filter_key: tuple, query_vec: np.ndarray) -> Optional[Dict[str, Any]]:
+    """Return the cached response most similar to query_vec under the same filters, if above threshold."""
+    with _semantic_cache_lock:
+        entries = [(entry_id, vec, resp) for entry_id, (key, vec, resp) in _semantic_cache.items() if key == filter_key]
+        if not entries:
+            return None
+        similarities = np.stack([vec for _, vec, _ in entries]) @ query_vec
+        best = int(np.argmax(similarities))
+        if similarities[best] < SEMANTIC_CACHE_THRESHOLD:
+            return None
+        entry_id, _, response = entries[best]
+        _semantic_cache.move_to_end(entry_id)
+        return copy.deepcopy(response)
+
+
+def _semantic_store(filter_key: tuple, query_vec: np.ndarray, response: Dict[str, Any]) -> None:
+    """Cache a response, evicting the least recently used entry when full."""
+    with _semantic_cache_lock:
+        # float16 halves the memory the similarity scan reads; the threshold check can spare the precision
+        _semantic_cache[next(_semantic_cache_ids)] = (filter_key, query_vec.astype(np.float16), copy.deepcopy(response))
+        while len(_semantic_cache) > SEMANTIC_CACHE_SIZE:
+            _semantic_cache.popitem(last=False)
+
+
+def clear_probe_cache() -> None:
+    """Drop cached answers (e.g. after new papers are indexed)."""
+    with _semantic_cache_lock:
+        _semantic_cache.clear()
+
+
+def invalidate_caches() -> None:
+    """
+    Retire every cached answer after the store was written to: the version bump misses the
+    _run answers and filter id-sets of rag_tool, and the semantic probe cache is emptied.
+    """
+    rag_tool._cache_version += 1
+    clear_probe_cache()
+
 
 def _research_probe_fn(
     query: str,
     topic: Optional[str] = None,
     subject: Optional[str] = None,
     year: Optional[int] = None,
-    k: int = 10
+    k: int = 10,
+    bypass_cache: bool = False
 ) -> Dict[str, Any]:
     """Search research papers and return structured response."""
     
@@ -66,12 +122,19 @@ def _research_probe_fn(
     try:
         # Initialize and get docs directly from vector store
         rag_tool._initialize_components()
-        metadata_filter = rag_tool._build_metadata_filter(subject, topic, year)
         
-        if metadata_filter:
-            docs = rag_tool._vectordb.similarity_search(query, k=k, filter=metadata_filter)
-        else:
-            docs = rag_tool._vectordb.similarity_search(query, k=k)
+        # Embed once: the vector serves both the semantic cache and the similarity search
+        embedding = rag_tool._embeddings.embed_query(query)
+        query_vec = np.asarray(embedding, dtype=np.float32)
+        query_vec /= np.linalg.norm(query_vec) or 1.0
+        # The store version keeps answers from before a re-index from matching
+        filter_key = (rag_tool._cache_version, topic, subject, year, k)
+        cached = None if bypass_cache else _semantic_lookup(filter_key, query_vec)
+        if cached is not None:
+            cached.update(topic=query.split("?")[0][:50], query=query)
+            return cached
+        
+        docs = rag_tool._search_by_vector(embedding, k, subject, topic, year)
         
         # Generate answer
         answer = rag_tool._generate_answer_from_docs(query, docs)
@@ -79,17 +142,13 @@ def _research_probe_fn(
         # Build sources directly from document metadata (no parsing!)
         sources = []
         for doc in docs:
-            md = doc.metadata or {}
+            title, doc_year, doc_topic, doc_subject, page = _source_fields(doc)
             sources.append(SourceReference(
-                paper_title=md.get("paper_title"),
-                year=md.get("year"),
-                topic=md.get("topic"),
-                subject=md.get("subject"),
-                page=(md.get("page", 0) + 1) if md.get("page") is not None else None
+                paper_title=title, year=doc_year, topic=doc_topic, subject=doc_subject, page=page
             ))
             # Infer category from first source if not filtered
-            if not topic and md.get("topic") and category == "General":
-                category = md.get("topic")
+            if not topic and doc_topic and category == "General":
+                category = doc_topic
         
         # Calculate confidence
         confidence = min(1.0, len(sources) * 0.1 + (0.3 if answer and "don't know" not in answer.lower() else 0.0))
@@ -104,10 +163,12 @@ def _research_probe_fn(
                 for i, s in enumerate(sources, 1) if s.paper_title
             )
         
-        return ResearchProbeResponse(
+        result = ResearchProbeResponse(
             topic=query.split("?")[0][:50], category=category, response=md_response,
             sources=sources, confidence=confidence, query=query, filters_applied=filters_applied
         ).model_dump()
+        _semantic_store(filter_key, query_vec, result)
+        return result
         
     except Exception as e:
         return ResearchProbeResponse(
@@ -7,16 +7,21 @@ Provides tools for:
 """
 
 from .Rag import RAGSearchTool
+from .cached_embeddings import CachedEmbeddings
 from .RagTool import (
     research_probe,
     ResearchProbeArgs,
     ResearchProbeResponse,
     SourceReference,
-    _research_probe_fn
+    _research_probe_fn,
+    clear_probe_cache,
+    invalidate_caches
 )
 from .corpus_expansion import (
     search_arxiv,
     download_pdf,
+    download_pdf_async,
+    download_papers,
     SearchArxivArgs,
     DownloadPdfArgs,
     PAPERS_PATH,
@@ -31,9 +36,14 @@ __all__ = [
     "ResearchProbeResponse",
     "SourceReference",
     "_research_probe_fn",
+    "clear_probe_cache",
+    "invalidate_caches",
+    "CachedEmbeddings",
     # Corpus Expansion
     "search_arxiv",
     "download_pdf",
+    "download_pdf_async",
+    "download_papers",
     "SearchArxivArgs",
     "DownloadPdfArgs",
     "PAPERS_PATH",
@@ -0,0 +1,156 @@
+"""
+Cached Embeddings - persistent, content-addressed cache around an embeddings model.
+
+Chunk vectors are stored in a local sqlite file keyed by SHA-256(model + "\\0" + text),
+so re-indexing the same paper (or overlapping chunks) does not call the API again.
+Vectors are stored as float16 (rows written before that stay float32, flagged by `half`).
+"""
+import os
+import hashlib
+import sqlite3
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+# Kept beside the VectorDB directory, not inside it: switching papers_path discards the whole
+# persist directory, while vectors keyed on model + text stay valid for any corpus
+EMBEDDINGS_CACHE_PATH = Path(os.getenv(
+    "EMBEDDINGS_CACHE_PATH",
+    Path(os.getenv("VECTORDB_DIR", Path(__file__).resolve().parent / "VectorDB")).parent
+    / "EmbeddingsCache" / "embeddings_cache.sqlite3"
+))
+
+# "openai" (default) or "local": a quantized ONNX model run in-process via fastembed.
+# Vector sizes differ between backends, so switching needs a fresh VectorDB.
+EMBEDDINGS_BACKEND = os.getenv("EMBEDDINGS_BACKEND", "openai").lower()
+LOCAL_EMBEDDINGS_MODEL = os.getenv("LOCAL_EMBEDDINGS_MODEL", "BAAI/bge-small-en-v1.5")
+
+# Keep IN (...) lookups below sqlite's bound-parameter limit
+_LOOKUP_BATCH = 500
+# Recent query vectors kept in memory (queries are not persisted)
+QUERY_CACHE_SIZE = 256
+
+# One (connection, lock) per cache file, shared by every CachedEmbeddings using it
+_connections: dict = {}
+_connections_lock = threading.Lock()
+
+
+def _open_cache(cache_path: Path) -> tuple:
+    """Shared connection to the cache file at cache_path, created (with its schema) on first use."""
+    key = str(cache_path.resolve())
+    with _connections_lock:
+        if key not in _connections:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(key, check_same_thread=False)
+            db.execute("CREATE TABLE IF NOT EXISTS cache (hash BLOB PRIMARY KEY, vector BLOB NOT NULL)")
+            # Older caches hold float32 rows only; flag them before float16 rows are added
+            if "half" not in {row[1] for row in db.execute("PRAGMA table_info(cache)")}:
+                db.execute("ALTER TABLE cache ADD COLUMN half INTEGER NOT NULL DEFAULT 0")
+            db.commit()
+            _connections[key] = (db, threading.Lock())
+        return _connections[key]
+
+
+def default_embeddings(**openai_kwargs) -> Embeddings:
+    """The configured embedding model; openai_kwargs only apply to the OpenAI backend."""
+    if EMBEDDINGS_BACKEND == "local":
+        from langchain_community.embeddings import FastEmbedEmbeddings
+        return FastEmbedEmbeddings(model_name=LOCAL_EMBEDDINGS_MODEL, batch_size=256)
+    return OpenAIEmbeddings(**openai_kwargs)
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves document vectors from a sqlite cache and embeds only misses."""
+
+    def __init__(self, inner: Optional[Embeddings] = None, cache_path: Path = EMBEDDINGS_CACHE_PATH):
+        self.inner = inner or default_embeddings()
+        # Cache keys need the model's name (FastEmbedEmbeddings.model is the loaded model object)
+        self.model_name = next(
+            (name for name in (getattr(self.inner, "model_name", None), getattr(self.inner, "model", None))
+             if isinstance(name, str)),
+            type(self.inner).__name__
+        )
+        self.cache_path = Path(cache_path)
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock: Optional[threading.Lock] = None
+        self._embed_query_cached = lru_cache(maxsize=QUERY_CACHE_SIZE)(
+            lambda text: tuple(self.inner.embed_query(text))
+        )
+
+    @property
+    def model(self) -> str:
+        """Name of the underlying embedding model."""
+        return self.model_name
+
+    def _connection(self) -> tuple:
+        """(connection, lock) for the cache file, opened on the first lookup or store."""
+        if self._db is None:
+            self._db, self._lock = _open_cache(self.cache_path)
+        return self._db, self._lock
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).digest()
+
+    @staticmethod
+    def _encode(vector: List[float]) -> bytes:
+        # float16 is ample precision for unit-norm embedding components and halves storage
+        return np.asarray(vector, dtype=np.float16).tobytes()
+
+    @staticmethod
+    def _decode(blob: bytes, half: int) -> List[float]:
+        return np.frombuffer(blob, dtype=np.float16 if half else np.float32).astype(np.float32).tolist()
+
+    def _lookup(self, texts: List[str]) -> tuple:
+        """Return (keys, cached vectors by key, uncached texts by key) for texts."""
+        keys = [self._key(t) for t in texts]
+        unique = list(dict.fromkeys(keys))
+        found = {}
+        db, lock = self._connection()
+        with lock:
+            for i in range(0, len(unique), _LOOKUP_BATCH):
+                batch = unique[i:i + _LOOKUP_BATCH]
+                rows = db.execute(
+                    f"SELECT hash, vector, half FROM cache WHERE hash IN ({','.join('?' * len(batch))})", batch
+                )
+                found.update((key, self._decode(blob, half)) for key, blob, half in rows)
+
+        misses = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                misses.setdefault(key, text)
+        return keys, found, misses
+
+    def _store(self, misses: dict, vectors: List[List[float]], found: dict):
+        db, lock = self._connection()
+        with lock:
+            db.executemany(
+                "INSERT OR IGNORE INTO cache (hash, vector, half) VALUES (?, ?, 1)",
+                [(key, self._encode(v)) for key, v in zip(misses, vectors)]
+            )
+            db.commit()
+        found.update(zip(misses, vectors))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Return vectors for texts, embedding only those not already cached."""
+        keys, found, misses = self._lookup(texts)
+        if misses:
+            self._store(misses, self.inner.embed_documents(list(misses.values())), found)
+        return [found[key] for key in keys]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async embed_documents; only the inner model's request for misses is awaited."""
+        keys, found, misses = self._lookup(texts)
+        if misses:
+            self._store(misses, await self.inner.aembed_documents(list(misses.values())), found)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Queries skip the sqlite cache (some models embed queries differently from documents),
+        but recent ones are memoized in memory so a repeated query costs no API call.
+        """
+        return list(self._embed_query_cached(text))
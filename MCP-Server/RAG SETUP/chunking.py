@@ -0,0 +1,74 @@
+"""
+Chunking - split loaded PDF pages into chunks for embedding, and rehydrate them on retrieval.
+
+Uses Chonkie's FastChunker (SIMD delimiter search in native code) instead of
+LangChain's pure-Python RecursiveCharacterTextSplitter. Chunks don't overlap: each one
+carries its page offsets (start_index/end_index), so adjacent text is not embedded or stored
+twice. On retrieval, expand_documents re-reads the page from the source PDF and widens
+each chunk by CONTEXT_PAD characters on both sides.
+"""
+import os
+from functools import lru_cache
+from typing import List, Optional
+import fitz
+from chonkie import FastChunker
+from langchain_core.documents import Document
+
+CHUNK_SIZE = 1500
+CHUNK_OVERLAP = 250
+# Context restored around a chunk on each side; a rehydrated chunk spans CHUNK_SIZE
+CONTEXT_PAD = CHUNK_OVERLAP // 2
+
+# Stored/embedded region per chunk; the overlap is restored at retrieval instead
+_chunker = FastChunker(chunk_size=CHUNK_SIZE - CHUNK_OVERLAP)
+
+
+def split_documents(raw_docs: List[Document]) -> List[Document]:
+    """Split page Documents into non-overlapping chunks tagged with their page offsets."""
+    chunks = []
+    for doc in raw_docs:
+        text = doc.page_content
+        for ch in _chunker.chunk(text):
+            chunk_text = ch.text.strip()
+            if chunk_text:
+                chunks.append(Document(
+                    page_content=chunk_text,
+                    metadata={**doc.metadata, "start_index": ch.start_index, "end_index": ch.end_index}
+                ))
+    return chunks
+
+
+@lru_cache(maxsize=512)
+def _page_text(file_path: str, page: int, mtime_ns: int) -> Optional[str]:
+    """Page text exactly as the loaders produce it; mtime_ns keys out stale entries."""
+    try:
+        with fitz.open(file_path) as doc:
+            return doc[page].get_text().strip()
+    except Exception:
+        return None
+
+
+def expand_documents(docs: List[Document]) -> List[Document]:
+    """
+    Widen retrieved chunks with CONTEXT_PAD characters of surrounding page text.
+    Chunks without offsets (indexed before offsets existed) or whose PDF is gone are returned as-is.
+    """
+    expanded = []
+    for doc in docs:
+        md = doc.metadata or {}
+        start, end, page = md.get("start_index"), md.get("end_index"), md.get("page")
+        text = None
+        if start is not None and end is not None and page is not None and md.get("file_path"):
+            try:
+                text = _page_text(md["file_path"], page, os.stat(md["file_path"]).st_mtime_ns)
+            except OSError:
+                pass
+        if text is None:
+            expanded.append(doc)
+        else:
+            expanded.append(Document(
+                id=doc.id,
+                page_content=text[max(0, start - CONTEXT_PAD):end + CONTEXT_PAD].strip(),
+                metadata=md
+            ))
+    return expanded
@@ -2,16 +2,32 @@
 Corpus Expansion Tools - arXiv search and PDF download with automatic vectordb indexing.
 """
 import os
+import sys
+import asyncio
+import copy
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 import arxiv
-import re
+from cachetools import TTLCache
+import chromadb
+import fitz
+import openai
 import requests
+import httpx
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, Field
 from langchain_community.document_loaders import PyMuPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from cached_embeddings import CachedEmbeddings, default_embeddings, EMBEDDINGS_BACKEND
+from chunking import split_documents
+from Rag import (
+    HNSW_COLLECTION_METADATA, _relpath, _file_digest, _record_indexed, _get_pdf_pool, _extract_page_range,
+    _count_tokens, _token_batches
+)
 
 # Max filename length - reduced to ensure total path stays under Windows 260 char limit
 MAX_FILENAME_LENGTH = 100
@@ -25,6 +41,28 @@ MAX_FILENAME_LENGTH = 100
 PAPERS_PATH = Path(os.getenv("PAPERS_DIR", Path(__file__).resolve().parent / "Papers"))
 VECTORDB_PATH = Path(os.getenv("VECTORDB_DIR", Path(__file__).resolve().parent / "VectorDB"))
 
+COLLECTION_NAME = "research_papers"
+# Max texts per embeddings request; requests are also capped at Rag.MAX_EMBED_BATCH_TOKENS,
+# since OpenAI's 300k-tokens-per-request limit binds long before its 2048-input limit
+EMBEDDING_CHUNK_SIZE = 1000
+# Records per Chroma write; 50-250 amortizes sqlite transactions without oversized calls
+CHROMA_BATCH_SIZE = 250
+# Bytes per streamed PDF read; bounds download memory to one chunk
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# PDFs with at least this many pages are text-extracted across worker processes
+LARGE_PDF_PAGES = 200
+# Page ranges per large PDF (extracted on Rag's shared PDF worker pool)
+PDF_WORKERS = min(4, os.cpu_count() or 1)
+
+# Opt-in: embed downloaded papers through the OpenAI Batch API (50% cheaper, but indexing
+# completes asynchronously within the 24h completion window instead of during the tool call).
+# Ignored with the local embeddings backend, which always indexes directly.
+USE_BATCH_API = (
+    os.getenv("USE_OPENAI_BATCH_API", "false").lower() in ("1", "true", "yes")
+    and EMBEDDINGS_BACKEND != "local"
+)
+BATCH_POLL_SECONDS = 60
+
 
 # ============== Pydantic Schemas ==============
 
@@ -34,6 +72,7 @@ class SearchArxivArgs(BaseModel):
     subject: Optional[str] = Field(default=None, description="Subject area (e.g., 'Artificial Intelligence')")
     topic: Optional[str] = Field(default=None, description="Topic within subject (e.g., 'Healthcare', 'NLP')")
     max_results: int = Field(default=10, ge=1, le=50, description="Maximum number of results to return")
+    force_refresh: bool = Field(default=False, description="Bypass the cached result and query arXiv again")
 
 
 class DownloadPdfArgs(BaseModel):
@@ -81,14 +120,16 @@ class DownloadResponse(BaseModel):
 
 # ============== Helper Functions ==============
 
+# Characters not allowed in Windows filenames: \ / : * ? " < > |
+_INVALID_FILENAME_CHARS = str.maketrans("", "", '\\/:*?"<>|')
+
+
 def sanitize_filename(name: str, max_length: int = MAX_FILENAME_LENGTH) -> str:
     """Remove invalid characters from filename and limit length."""
-    # Remove characters not allowed in Windows filenames: \ / : * ? " < > |
-    sanitized = re.sub(r'[\\/:*?"<>|]', '', name)
-    # Replace multiple spaces with single space
-    sanitized = re.sub(r'\s+', ' ', sanitized)
-    # Trim and limit length
-    return sanitized.strip()[:max_length]
+    # Drop invalid characters in a single translate pass
+    sanitized = name.translate(_INVALID_FILENAME_CHARS)
+    # Collapse whitespace runs to single spaces and trim, then limit length
+    return " ".join(sanitized.split())[:max_length]
 
 
 def shorten_title(title: str, max_length: int = MAX_FILENAME_LENGTH) -> str:
@@ -129,10 +170,10 @@ def _extract_paper_metadata(file_path: Path, base_path: Path) -> dict:
         parts = rel_path.parts
         
         if len(parts) >= 3:
-            metadata["subject"] = parts[0]
-            metadata["topic"] = parts[1]
+            metadata["subject"] = sys.intern(parts[0])
+            metadata["topic"] = sys.intern(parts[1])
         elif len(parts) == 2:
-            metadata["subject"] = parts[0]
+            metadata["subject"] = sys.intern(parts[0])
             
         # Extract year from filename: "title - year.pdf"
         stem = file_path.stem
@@ -150,46 +191,174 @@ def _extract_paper_metadata(file_path: Path, base_path: Path) -> dict:
     return metadata
 
 
+def _load_pdf(file_path: Path) -> List[Document]:
+    """
+    Load a PDF into one Document per page.
+    Small PDFs use PyMuPDFLoader directly; large ones are split into page ranges
+    extracted in parallel worker processes, so they don't pay the process start-up cost.
+    """
+    with fitz.open(file_path) as doc:
+        page_count = doc.page_count
+        pdf_metadata = {k: v for k, v in doc.metadata.items() if isinstance(v, (str, int))}
+    if page_count < LARGE_PDF_PAGES or PDF_WORKERS < 2:
+        return PyMuPDFLoader(str(file_path)).load()
+    
+    step = -(-page_count // PDF_WORKERS)
+    starts = list(range(0, page_count, step))
+    ends = [min(start + step, page_count) for start in starts]
+    # Each worker opens its own document; fitz handles must not cross process boundaries.
+    # The pool is Rag's shared spawn-context one, so concurrent downloads don't each fork a pool.
+    parts = list(_get_pdf_pool().map(_extract_page_range, [str(file_path)] * len(starts), starts, ends))
+    
+    # Mirror the page metadata PyMuPDFLoader would attach
+    base_metadata = {
+        "producer": "PyMuPDF",
+        "creator": "PyMuPDF",
+        "creationdate": "",
+        **pdf_metadata,
+        "moddate": pdf_metadata.get("modDate", ""),
+        "source": str(file_path),
+        "file_path": str(file_path),
+        "total_pages": page_count,
+    }
+    return [
+        Document(page_content=text, metadata={**base_metadata, "page": page})
+        for part in parts for page, text in part
+    ]
+
+
+def _load_and_split(file_path: Path, papers_base_path: Path = PAPERS_PATH, content_hash: Optional[str] = None) -> list:
+    """Load a PDF, attach paper metadata and split it into chunks."""
+    # Load the PDF
+    raw_docs = _load_pdf(file_path)
+    
+    # Paper-level metadata is identical for every chunk: build it once
+    paper_metadata = {
+        **_extract_paper_metadata(file_path, papers_base_path),
+        "doc_id": file_path.stem,
+        "relpath": _relpath(file_path, papers_base_path),
+        "content_hash": content_hash or _file_digest(file_path)
+    }
+    
+    # Split into chunks first, so only the per-page loader metadata is copied per chunk,
+    # then merge the shared fields into each chunk (values are shared references, not copies)
+    chunks = split_documents(raw_docs)
+    for chunk in chunks:
+        chunk.metadata.update(paper_metadata)
+    return chunks
+
+
+def _chunk_ids(doc_id: str, count: int) -> List[str]:
+    """Deterministic chunk ids, so re-indexing a paper overwrites its chunks instead of duplicating them."""
+    return [f"{doc_id}_{i}" for i in range(count)]
+
+
+_collection_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _open_collection(collection_name: str, vectordb_path: str):
+    """One shared collection handle per (collection, store path)."""
+    Path(vectordb_path).mkdir(parents=True, exist_ok=True)
+    client = chromadb.PersistentClient(path=vectordb_path)
+    # Vectors are always computed by us, so the collection needs no embedding function
+    return client.get_or_create_collection(
+        collection_name, embedding_function=None, metadata=HNSW_COLLECTION_METADATA
+    )
+
+
+def _get_collection(vectordb_path: Path = VECTORDB_PATH):
+    """Open (or create) the research papers collection in the persistent Chroma store."""
+    # Concurrent first opens of a PersistentClient race on tenant setup; serialize them
+    with _collection_lock:
+        return _open_collection(COLLECTION_NAME, str(vectordb_path))
+
+
+@lru_cache(maxsize=1)
+def _get_embeddings() -> CachedEmbeddings:
+    """Shared embeddings client; chunk vectors are served from the on-disk cache when seen before."""
+    return CachedEmbeddings(default_embeddings(chunk_size=EMBEDDING_CHUNK_SIZE))
+
+
+def _embed_texts(texts: List[str]) -> List[List[float]]:
+    """Embed texts in requests within both the EMBEDDING_CHUNK_SIZE and token budgets."""
+    embeddings = _get_embeddings()
+    vectors = []
+    for start, end in _token_batches(_count_tokens(texts), EMBEDDING_CHUNK_SIZE):
+        vectors.extend(embeddings.embed_documents(texts[start:end]))
+    return vectors
+
+
+def _needs_indexing(file_path: Path, vectordb_path: Path = VECTORDB_PATH) -> tuple:
+    """
+    Check whether a PDF still has to be indexed; returns (needed, content_hash).
+    Papers already stored under the same doc_id are skipped unless their content changed,
+    in which case the stale chunks are removed first.
+    """
+    content_hash = _file_digest(file_path)
+    collection = _get_collection(vectordb_path)
+    existing = collection.get(where={"doc_id": file_path.stem}, limit=1, include=["metadatas"])
+    if not existing["ids"]:
+        return True, content_hash
+    
+    # Chunks indexed before content hashes were recorded count as current
+    stored_hash = (existing["metadatas"][0] or {}).get("content_hash")
+    if stored_hash in (None, content_hash):
+        print(f"✓ Already indexed: {file_path.name}")
+        return False, content_hash
+    
+    collection.delete(where={"doc_id": file_path.stem})
+    _invalidate_rag_caches()
+    return True, content_hash
+
+
+def _invalidate_rag_caches():
+    """Retire the RAG tool's cached answers after this module wrote to the store."""
+    try:
+        from RagTool import invalidate_caches
+        invalidate_caches()
+    except Exception as e:
+        print(f"Warning: Could not invalidate RAG caches: {e}")
+
+
+def _upsert_batched(vectordb_path: Path, ids: list, embeddings: list, documents: list, metadatas: list):
+    """Upsert records into the collection in CHROMA_BATCH_SIZE slices."""
+    collection = _get_collection(vectordb_path)
+    try:
+        for i in range(0, len(ids), CHROMA_BATCH_SIZE):
+            end = i + CHROMA_BATCH_SIZE
+            collection.upsert(
+                ids=ids[i:end],
+                embeddings=embeddings[i:end],
+                documents=documents[i:end],
+                metadatas=metadatas[i:end],
+            )
+    finally:
+        # Invalidate at the write itself, so no caller can leave answers cached against the old store
+        _invalidate_rag_caches()
+
+
 def _add_to_vectordb(file_path: Path, papers_base_path: Path = PAPERS_PATH, vectordb_path: Path = VECTORDB_PATH) -> bool:
     """
     Add a downloaded PDF to the vector database.
+    All chunks are embedded in batched requests, then upserted with precomputed vectors.
     """
     try:
-        # Load the PDF
-        loader = PyMuPDFLoader(str(file_path))
-        raw_docs = loader.load()
+        needed, content_hash = _needs_indexing(file_path, vectordb_path)
+        if not needed:
+            return True
         
-        # Extract and add metadata
-        paper_metadata = _extract_paper_metadata(file_path, papers_base_path)
-        for doc in raw_docs:
-            doc.metadata.update(paper_metadata)
-            doc.metadata.update({
-                "doc_id": file_path.stem,
-                "relpath": str(file_path.relative_to(papers_base_path)) if papers_base_path in file_path.parents or file_path.parent == papers_base_path else file_path.name
-            })
+        split_docs = _load_and_split(file_path, papers_base_path, content_hash)
+        if not split_docs:
+            return False
         
-        # Split into chunks
-        splitter = RecursiveCharacterTextSplitter(chunk_size=1500, chunk_overlap=250)
-        split_docs = splitter.split_documents(raw_docs)
+        texts = [doc.page_content for doc in split_docs]
+        metadatas = [doc.metadata for doc in split_docs]
+        ids = _chunk_ids(file_path.stem, len(texts))
         
-        # Load existing vectordb or create new one
-        embeddings = OpenAIEmbeddings()
-        
-        if (vectordb_path / "chroma.sqlite3").exists():
-            vectordb = Chroma(
-                collection_name="research_papers",
-                embedding_function=embeddings,
-                persist_directory=str(vectordb_path),
-            )
-            vectordb.add_documents(split_docs)
-        else:
-            vectordb_path.mkdir(parents=True, exist_ok=True)
-            Chroma.from_documents(
-                documents=split_docs,
-                embedding=embeddings,
-                collection_name="research_papers",
-                persist_directory=str(vectordb_path),
-            )
+        vectors = _embed_texts(texts)
+        _upsert_batched(vectordb_path, ids, vectors, texts, metadatas)
+        _record_indexed(vectordb_path, [file_path])
         
         return True
     except Exception as e:
@@ -197,13 +366,105 @@ def _add_to_vectordb(file_path: Path, papers_base_path: Path = PAPERS_PATH, vect
         return False
 
 
+def _queue_batch_indexing(file_path: Path, papers_base_path: Path = PAPERS_PATH, vectordb_path: Path = VECTORDB_PATH) -> bool:
+    """
+    Submit the chunk embeddings of a downloaded PDF to the OpenAI Batch API.
+    A background thread polls the batch and writes the vectors into the vector database.
+    """
+    try:
+        needed, content_hash = _needs_indexing(file_path, vectordb_path)
+        if not needed:
+            return True
+        
+        split_docs = _load_and_split(file_path, papers_base_path, content_hash)
+        if not split_docs:
+            return False
+        
+        # Use the same embedding model as query-time retrieval
+        model = _get_embeddings().model
+        requests_jsonl = "\n".join(
+            json.dumps({
+                "custom_id": f"{file_path.stem}:{i}",
+                "method": "POST",
+                "url": "/v1/embeddings",
+                "body": {"model": model, "input": doc.page_content},
+            })
+            for i, doc in enumerate(split_docs)
+        )
+        
+        client = openai.OpenAI()
+        batch_file = client.files.create(
+            file=(f"{file_path.stem}.jsonl", requests_jsonl.encode("utf-8")),
+            purpose="batch",
+        )
+        batch = client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/embeddings",
+            completion_window="24h",
+        )
+        
+        threading.Thread(
+            target=_poll_batch_and_index,
+            args=(client, batch.id, file_path.stem, split_docs, vectordb_path),
+            daemon=True,
+        ).start()
+        return True
+    except Exception as e:
+        print(f"Warning: Failed to queue batch indexing: {e}")
+        return False
+
+
+def _poll_batch_and_index(client, batch_id: str, doc_id: str, split_docs: list, vectordb_path: Path):
+    """Wait for an embeddings batch to finish and upsert its vectors into Chroma."""
+    try:
+        while True:
+            batch = client.batches.retrieve(batch_id)
+            if batch.status == "completed":
+                break
+            if batch.status in ("failed", "expired", "cancelled"):
+                print(f"Warning: Embedding batch {batch_id} for {doc_id} ended with status '{batch.status}'")
+                return
+            time.sleep(BATCH_POLL_SECONDS)
+        
+        vectors = {}
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") == 200:
+                vectors[record["custom_id"]] = response["body"]["data"][0]["embedding"]
+        
+        ids, embeddings, documents, metadatas = [], [], [], []
+        for i, (doc, chunk_id) in enumerate(zip(split_docs, _chunk_ids(doc_id, len(split_docs)))):
+            custom_id = f"{doc_id}:{i}"
+            if custom_id in vectors:
+                ids.append(chunk_id)
+                embeddings.append(vectors[custom_id])
+                documents.append(doc.page_content)
+                metadatas.append(doc.metadata)
+        
+        if ids:
+            _upsert_batched(vectordb_path, ids, embeddings, documents, metadatas)
+            _reinitialize_rag()
+        if len(ids) == len(split_docs):
+            _record_indexed(vectordb_path, [split_docs[0].metadata["file_path"]])
+        print(f"✓ Batch indexed {len(ids)}/{len(split_docs)} chunks for {doc_id}")
+    except Exception as e:
+        print(f"Warning: Batch indexing failed for {doc_id}: {e}")
+
+
 # ============== Main Tool Functions ==============
 
+# Identical searches within an hour are served from memory instead of re-querying arXiv
+_arxiv_cache = TTLCache(maxsize=512, ttl=3600)
+_arxiv_cache_lock = threading.Lock()
+
+
 def search_arxiv(
     query: str,
     subject: Optional[str] = None,
     topic: Optional[str] = None,
-    max_results: int = 10
+    max_results: int = 10,
+    force_refresh: bool = False
 ) -> Dict[str, Any]:
     """
     Search arXiv for papers.
@@ -213,10 +474,18 @@ def search_arxiv(
         subject: Subject area (e.g., 'Artificial Intelligence')
         topic: Topic within subject (e.g., 'Healthcare', 'NLP')
         max_results: Maximum number of results to return
+        force_refresh: Skip the cache and query arXiv again
         
     Returns:
         Dict with query info and list of papers
     """
+    cache_key = (query, subject, topic, max_results)
+    if not force_refresh:
+        with _arxiv_cache_lock:
+            cached = _arxiv_cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+    
     # Build enhanced query with subject/topic if provided
     full_query = query
     if subject:
@@ -246,13 +515,155 @@ def search_arxiv(
             "topic": topic,
         })
     
-    return {
+    result = {
         "query": query,
         "subject": subject,
         "topic": topic,
         "count": len(papers),
         "papers": papers
     }
+    with _arxiv_cache_lock:
+        _arxiv_cache[cache_key] = copy.deepcopy(result)
+    return result
+
+
+def _target_path(
+    title: str,
+    year: Optional[int] = None,
+    subject: Optional[str] = None,
+    topic: Optional[str] = None
+) -> Path:
+    """Build (and create the folder for) PAPERS_PATH/subject/topic/title - year.pdf."""
+    # Build path: PAPERS_PATH/subject/topic/
+    subject_val = subject or "General"
+    topic_val = topic or "Uncategorized"
+    
+    # Sanitize directory names
+    subject_dir = sanitize_filename(subject_val, max_length=50)
+    topic_dir = sanitize_filename(topic_val, max_length=50)
+    
+    # Use pathlib for cross-platform path handling
+    full_dir = PAPERS_PATH / subject_dir / topic_dir
+    full_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Determine filename
+    shortened = shorten_title(title)
+    base_name = sanitize_filename(shortened)
+    
+    # Add year and .pdf extension
+    filename = f"{base_name} - {year}.pdf" if year else f"{base_name}.pdf"
+    return full_dir / filename
+
+
+def _download_only(
+    pdf_url: str,
+    title: str,
+    year: Optional[int] = None,
+    subject: Optional[str] = None,
+    topic: Optional[str] = None
+) -> Path:
+    """Download a PDF into PAPERS_PATH/subject/topic/ and return its path."""
+    file_path = _target_path(title, year, subject, topic)
+
+    # Stream the PDF to disk; write to a .part file so a failed download never leaves a truncated PDF
+    part_path = file_path.with_name(file_path.name + ".part")
+    try:
+        with requests.get(pdf_url, timeout=60, stream=True) as resp:
+            resp.raise_for_status()
+            with open(part_path, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+        part_path.replace(file_path)
+    finally:
+        part_path.unlink(missing_ok=True)
+    
+    return file_path
+
+
+async def _download_only_async(
+    pdf_url: str,
+    title: str,
+    year: Optional[int] = None,
+    subject: Optional[str] = None,
+    topic: Optional[str] = None
+) -> Path:
+    """Async variant of _download_only; the event loop stays free while the PDF streams in."""
+    file_path = _target_path(title, year, subject, topic)
+
+    part_path = file_path.with_name(file_path.name + ".part")
+    try:
+        async with httpx.AsyncClient(timeout=60, follow_redirects=True) as client:
+            async with client.stream("GET", pdf_url) as resp:
+                resp.raise_for_status()
+                # 64 KiB local writes are short; only the network reads are awaited
+                with open(part_path, "wb") as f:
+                    async for chunk in resp.aiter_bytes(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+        part_path.replace(file_path)
+    finally:
+        part_path.unlink(missing_ok=True)
+    
+    return file_path
+
+
+def _reinitialize_rag() -> bool:
+    """Reinitialize the RAG tool so it picks up newly indexed documents."""
+    try:
+        from RagTool import rag_tool
+        rag_tool._initialize_components()
+        return True
+    except Exception as e:
+        # If reinitialization fails, log but don't break the flow
+        print(f"Warning: RAG reinit failed: {e}")
+        return False
+
+
+def _index_after_download(file_path: Path) -> Dict[str, bool]:
+    """Index a downloaded PDF (directly or through the Batch API) and refresh the RAG tool."""
+    status = {"vectordb_indexed": False, "rag_reinitialized": False, "batch_queued": False}
+    if USE_BATCH_API:
+        status["batch_queued"] = _queue_batch_indexing(file_path, papers_base_path=PAPERS_PATH)
+    else:
+        status["vectordb_indexed"] = _add_to_vectordb(file_path, papers_base_path=PAPERS_PATH)
+        if status["vectordb_indexed"]:
+            status["rag_reinitialized"] = _reinitialize_rag()
+    return status
+
+
+def _download_message(file_path: Path, vectordb_indexed: bool, rag_reinitialized: bool, batch_queued: bool) -> str:
+    """Build the user-facing status line for a downloaded paper."""
+    message = f"Downloaded: {file_path}"
+    if vectordb_indexed:
+        message += " | Added to vector database ✓"
+        if rag_reinitialized:
+            message += " | RAG reinitialized ✓"
+    elif batch_queued:
+        message += " | Queued for batch indexing (available once the OpenAI batch completes)"
+    return message
+
+
+_NOT_INDEXED = {"vectordb_indexed": False, "rag_reinitialized": False, "batch_queued": False}
+
+
+def _download_success(file_path: Path, status: Dict[str, bool]) -> Dict[str, Any]:
+    """Success result shared by the download entrypoints."""
+    return {
+        "success": True,
+        "file_path": str(file_path),
+        "vectordb_indexed": status["vectordb_indexed"],
+        "message": _download_message(file_path, **status)
+    }
+
+
+def _download_error(e: Exception) -> Dict[str, Any]:
+    """Failure result shared by the download entrypoints."""
+    prefix = "Download failed" if isinstance(e, (requests.RequestException, httpx.HTTPError)) else "Error"
+    return {
+        "success": False,
+        "file_path": None,
+        "vectordb_indexed": False,
+        "message": f"{prefix}: {str(e)}"
+    }
 
 
 def download_pdf(
@@ -286,72 +697,124 @@ def download_pdf(
         }
     
     try:
-        # Build path: PAPERS_PATH/subject/topic/
-        subject_val = subject or "General"
-        topic_val = topic or "Uncategorized"
+        file_path = _download_only(pdf_url, title, year, subject, topic)
         
-        # Sanitize directory names
-        subject_dir = sanitize_filename(subject_val, max_length=50)
-        topic_dir = sanitize_filename(topic_val, max_length=50)
-        
-        # Use pathlib for cross-platform path handling
-        full_dir = PAPERS_PATH / subject_dir / topic_dir
-        full_dir.mkdir(parents=True, exist_ok=True)
+        # Add to vector database if requested
+        status = _index_after_download(file_path) if add_to_vectordb else _NOT_INDEXED
+        return _download_success(file_path, status)
         
-        # Determine filename
-        shortened = shorten_title(title)
-        base_name = sanitize_filename(shortened)
+    except Exception as e:
+        return _download_error(e)
+
+
+async def download_pdf_async(
+    pdf_url: str,
+    title: str,
+    year: Optional[int] = None,
+    subject: Optional[str] = None,
+    topic: Optional[str] = None,
+    add_to_vectordb: bool = True
+) -> Dict[str, Any]:
+    """
+    Async variant of download_pdf for async tool handlers.
+    The download is awaited on the event loop; indexing (PDF parsing, embeddings, Chroma)
+    runs in a worker thread so other requests are served meanwhile.
+    """
+    if not pdf_url:
+        return {
+            "success": False,
+            "file_path": None,
+            "vectordb_indexed": False,
+            "message": "No PDF URL provided"
+        }
+    
+    try:
+        file_path = await _download_only_async(pdf_url, title, year, subject, topic)
         
-        # Add year and .pdf extension
-        filename = f"{base_name} - {year}.pdf" if year else f"{base_name}.pdf"
-        file_path = full_dir / filename
-
-        # Download the PDF
-        resp = requests.get(pdf_url, timeout=60)
-        resp.raise_for_status()
-        file_path.write_bytes(resp.content)
+        status = await asyncio.to_thread(_index_after_download, file_path) if add_to_vectordb else _NOT_INDEXED
+        return _download_success(file_path, status)
         
-        # Add to vector database if requested
-        vectordb_indexed = False
-        rag_reinitialized = False
-        if add_to_vectordb:
-            vectordb_indexed = _add_to_vectordb(file_path, papers_base_path=PAPERS_PATH)
-            
-            # If vectordb was updated, reinitialize the RAG tool to pick up new documents
-            if vectordb_indexed:
+    except Exception as e:
+        return _download_error(e)
+
+
+def download_papers(items: List[Dict[str, Any]], max_workers: int = 8, add_to_vectordb: bool = True) -> Dict[str, Any]:
+    """
+    Download several papers concurrently and index them together.
+    
+    Downloads (and PDF parsing) run on a thread pool; the chunks of every downloaded paper
+    are then embedded together in token-capped requests and written with a single upsert pass.
+    
+    Args:
+        items: Dicts with DownloadPdfArgs fields (pdf_url, title, year, subject, topic)
+        max_workers: Maximum concurrent downloads
+        add_to_vectordb: Whether to add the downloaded papers to the vector DB
+    
+    Returns:
+        Dict with per-paper results (in input order) and a summary message
+    """
+    direct_index = add_to_vectordb and not USE_BATCH_API
+
+    def fetch(item: Dict[str, Any]):
+        if not item.get("pdf_url"):
+            raise ValueError("No PDF URL provided")
+        file_path = _download_only(
+            item["pdf_url"], item["title"], item.get("year"), item.get("subject"), item.get("topic")
+        )
+        if not direct_index:
+            return file_path, None, False
+        needed, content_hash = _needs_indexing(file_path)
+        if not needed:
+            return file_path, None, True
+        # Parse on the worker so PDF loading overlaps the remaining downloads
+        return file_path, _load_and_split(file_path, PAPERS_PATH, content_hash), False
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    downloaded = {}
+    if items:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as ex:
+            futures = {ex.submit(fetch, item): i for i, item in enumerate(items)}
+            for future in as_completed(futures):
+                i = futures[future]
                 try:
-                    from RagTool import rag_tool
-                    rag_tool._initialize_components()
-                    rag_reinitialized = True
+                    downloaded[i] = future.result()
                 except Exception as e:
-                    # If reinitialization fails, log but don't break the flow
-                    print(f"Warning: RAG reinit failed: {e}")
-        
-        # Build result message
-        message = f"Downloaded: {file_path}"
-        if vectordb_indexed:
-            message += " | Added to vector database ✓"
-            if rag_reinitialized:
-                message += " | RAG reinitialized ✓"
-        
-        return {
+                    results[i] = _download_error(e)
+
+    # Embed every new chunk together (token-capped requests) and upsert once
+    indexed = set()
+    if direct_index:
+        ids, texts, metadatas = [], [], []
+        for i, (file_path, split_docs, _) in downloaded.items():
+            if not split_docs:
+                continue
+            ids.extend(_chunk_ids(file_path.stem, len(split_docs)))
+            texts.extend(doc.page_content for doc in split_docs)
+            metadatas.extend(doc.metadata for doc in split_docs)
+            indexed.add(i)
+        if texts:
+            try:
+                vectors = _embed_texts(texts)
+                _upsert_batched(VECTORDB_PATH, ids, vectors, texts, metadatas)
+                _record_indexed(VECTORDB_PATH, [downloaded[i][0] for i in indexed])
+            except Exception as e:
+                print(f"Warning: Failed to add documents to vectordb: {e}")
+                indexed.clear()
+    rag_reinitialized = _reinitialize_rag() if indexed else False
+
+    for i, (file_path, _, already_indexed) in downloaded.items():
+        batch_queued = add_to_vectordb and USE_BATCH_API and _queue_batch_indexing(file_path, papers_base_path=PAPERS_PATH)
+        vectordb_indexed = i in indexed or already_indexed
+        results[i] = {
             "success": True,
             "file_path": str(file_path),
             "vectordb_indexed": vectordb_indexed,
-            "message": message
-        }
-        
-    except requests.RequestException as e:
-        return {
-            "success": False,
-            "file_path": None,
-            "vectordb_indexed": False,
-            "message": f"Download failed: {str(e)}"
+            "message": _download_message(file_path, vectordb_indexed, rag_reinitialized and i in indexed, batch_queued)
         }
-    except Exception as e:
-        return {
-            "success": False,
-            "file_path": None,
-            "vectordb_indexed": False,
-            "message": f"Error: {str(e)}"
-        }
\ No newline at end of file
+
+    succeeded = sum(1 for r in results if r["success"])
+    return {
+        "success": succeeded > 0,
+        "results": results,
+        "message": f"Downloaded {succeeded}/{len(items)} papers" + (f" | Indexed {len(indexed)} ✓" if indexed else "")
+    }